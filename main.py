@@ -1,4 +1,5 @@
 import pandas as pd
+import numpy as np
 import os
 import sqlite3
 import json
@@ -18,13 +19,41 @@ from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from starlette.requests import Request
 from fastapi.staticfiles import StaticFiles
-from io import BytesIO
+from io import StringIO
 import datetime
-from typing import Optional  # Add this line
-from collections import defaultdict
+from typing import List, Optional  # Add this line
+from collections import defaultdict, deque, OrderedDict
 from fastapi.responses import StreamingResponse
 import csv
+import codecs
 import functools
+import itertools
+import hashlib
+import base64
+import inspect
+import threading
+import asyncio
+import queue
+import tempfile
+import shutil
+import uuid
+import zipfile
+import zlib
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+try:  # Optional: only the Parquet and Arrow database formats need pyarrow
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+try:  # Unix only: advisory locks that keep other processes' database files in place
+    import fcntl
+except ImportError:
+    fcntl = None
 
 # Initialize FastAPI app
 app = FastAPI()
@@ -45,11 +74,482 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
 
+# --- SQLite connection management ---
+DATABASE_PATH = "components.db"
+
+# Pragmas applied to every pooled connection (journal_mode=WAL is set separately)
+SQLITE_PRAGMAS = {
+    "synchronous": "NORMAL",  # safe with WAL, avoids an fsync per commit
+    "cache_size": -20000,  # page cache size in KiB (~20 MB per connection)
+    "mmap_size": 268435456,  # memory-map up to 256 MB of the database file
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,  # ms to wait for a lock before "database is locked"
+}
+
+# Seconds replace_file() waits for connections in use to be released before swapping;
+# new queries wait as long, like busy_timeout lets them wait for a lock
+SWAP_DRAIN_TIMEOUT = 5
+
+
+class ConnectionPool:
+    """Thread-safe pool of reusable SQLite connections to the component database.
+
+    Connections are opened in WAL mode so readers keep working while a write
+    transaction is open. Use acquire()/release() around each unit of work.
+
+    While the process has the database open it holds a shared advisory lock on the
+    file path + ".lock"; replace_file() needs it exclusively, so it never swaps the
+    file under another process (e.g. a command-line import next to the server). The
+    lock is released when the last connection is closed.
+    """
+
+    def __init__(self, path, max_idle=8):
+        self.path = path
+        self.max_idle = max_idle
+        self._idle = []
+        self._epoch = 0  # bumped by close_all() to retire checked-out connections
+        self._checked_out = {}
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._file_lock = threading.Lock()  # held while replace_file() swaps the file
+        self._lock_file = None
+        self._lock_users = 0  # open connections, plus a running replace_file()
+        self._lock_file_lock = threading.Lock()
+
+    def _hold_shared_lock(self):
+        # Blocks while another process is swapping the file
+        with self._lock_file_lock:
+            self._lock_users += 1
+            if self._lock_file is None:
+                self._lock_file = open(self.path + ".lock", "a")
+                if fcntl is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_SH)
+
+    def _drop_shared_lock(self):
+        with self._lock_file_lock:
+            self._lock_users -= 1
+            if not self._lock_users:
+                self._lock_file.close()  # releases the lock
+                self._lock_file = None
+
+    def _lock_exclusively(self):
+        """Turn the shared advisory lock into an exclusive one unless another process holds it."""
+        if fcntl is None:
+            return True  # os.replace() itself fails on Windows while the file is open
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            # A failed conversion may have dropped the shared lock
+            fcntl.flock(self._lock_file, fcntl.LOCK_SH)
+            return False
+
+    def _connect(self):
+        with self._file_lock:
+            self._hold_shared_lock()
+            try:
+                conn = sqlite3.connect(self.path, check_same_thread=False)
+            except Exception:
+                self._drop_shared_lock()
+                raise
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            for name, value in SQLITE_PRAGMAS.items():
+                conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    def _disconnect(self, conn):
+        """Close a connection made by _connect()."""
+        conn.close()
+        self._drop_shared_lock()
+
+    def acquire(self):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+            epoch = self._epoch
+        if conn is None:
+            conn = self._connect()
+        with self._lock:
+            self._checked_out[id(conn)] = epoch
+        return conn
+
+    def release(self, conn):
+        with self._lock:
+            epoch = self._checked_out.get(id(conn))
+        if epoch is None:
+            return  # already released
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if epoch == self._epoch and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                self._checked_out.pop(id(conn), None)
+                self._released.notify_all()
+                return
+        # Closed before replace_file() is told, which may be waiting to swap the file
+        self._disconnect(conn)
+        with self._lock:
+            self._checked_out.pop(id(conn), None)
+            self._released.notify_all()
+
+    def close_all(self):
+        """Close idle connections; connections in use are closed when released."""
+        with self._lock:
+            self._epoch += 1
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._disconnect(conn)
+
+    def replace_file(self, path, timeout=SWAP_DRAIN_TIMEOUT):
+        """Atomically move the database file at path over this pool's file.
+
+        New connections wait until the new file is in place, so readers see either the
+        old or the new database. Connections in use must be released within timeout
+        seconds, or the swap is refused with a 503: closing a connection to the old
+        file after the swap could delete the WAL file of the new one, which has the
+        same name. The swap is refused with a 409 while another process has the
+        database open, as its connections would keep using the replaced file.
+        """
+        with self._file_lock:
+            self._hold_shared_lock()
+            try:
+                if not self._lock_exclusively():
+                    raise HTTPException(
+                        status_code=409,
+                        detail="Another process (e.g. a command-line import) has the "
+                        "database open; it cannot be replaced until that process exits.",
+                    )
+                try:
+                    self.close_all()
+                    with self._lock:
+                        drained = self._released.wait_for(
+                            lambda: not self._checked_out, timeout
+                        )
+                    if not drained:
+                        raise HTTPException(
+                            status_code=503,
+                            detail="The database is busy (e.g. a running export); "
+                            "try again once it has finished.",
+                        )
+                    # Stale WAL/shared-memory files must not be applied to the new file
+                    for suffix in ("-wal", "-shm", "-journal"):
+                        if os.path.exists(self.path + suffix):
+                            os.remove(self.path + suffix)
+                    os.replace(path, self.path)
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(self._lock_file, fcntl.LOCK_SH)
+            finally:
+                self._drop_shared_lock()
+
+db_pool = ConnectionPool(DATABASE_PATH)
+
+
+def remove_database_files(path=DATABASE_PATH):
+    """Delete a database file together with its WAL/shared-memory/journal files."""
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+# --- Executors for blocking database / pandas work ---
+# Thread limits per workload class, overridable via EASYDRAWERS_<CLASS>_WORKERS.
+# Writes do not get an executor: they all go through the single db_writer thread.
+WORKER_LIMITS = {
+    "read": int(os.environ.get("EASYDRAWERS_READ_WORKERS", 8)),
+    "import": int(os.environ.get("EASYDRAWERS_IMPORT_WORKERS", 1)),
+}
+
+executors = {
+    workload: ThreadPoolExecutor(max_workers=limit, thread_name_prefix=f"db-{workload}")
+    for workload, limit in WORKER_LIMITS.items()
+}
+
+# Keep enough idle connections for every worker thread
+db_pool.max_idle = sum(WORKER_LIMITS.values())
+
+# Maximum number of queued mutations committed together in one transaction
+WRITE_BATCH_SIZE = int(os.environ.get("EASYDRAWERS_WRITE_BATCH_SIZE", 64))
+
+# CSV rows parsed, classified and written per step by the upload endpoints
+IMPORT_CHUNK_ROWS = int(os.environ.get("EASYDRAWERS_IMPORT_CHUNK_ROWS", 5000))
+UPLOAD_SPOOL_CHUNK_BYTES = 1 << 20
+
+# Set in the environment of the batch import worker processes
+IMPORT_WORKER_ENV = "EASYDRAWERS_IMPORT_WORKER"
+
+
+async def run_blocking(workload, func, *args, **kwargs):
+    """Run a blocking call in the executor of the given workload class."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executors[workload], functools.partial(func, *args, **kwargs)
+    )
+
+
+def offload(workload):
+    """Turn a synchronous endpoint into an async one that runs in the workload's executor.
+
+    Heavy imports then only occupy the "import" threads, so lightweight reads keep
+    a low latency and the event loop stays free to accept requests.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await run_blocking(workload, func, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+async def spool_upload(file):
+    """Copy an upload to a temporary file in fixed-size chunks and return its path.
+
+    The caller removes the file once it has been processed.
+    """
+    spool = tempfile.NamedTemporaryFile(prefix="easydrawers-", suffix=".csv", delete=False)
+    try:
+        with spool:
+            while chunk := await file.read(UPLOAD_SPOOL_CHUNK_BYTES):
+                spool.write(chunk)
+    except BaseException:
+        os.remove(spool.name)
+        raise
+    return spool.name
+
+
+# Number of background import jobs kept for status polling
+IMPORT_JOB_HISTORY = 100
+
+
+class ImportJob:
+    """A background import whose progress is polled through /import_jobs/{job_id}.
+
+    The import functions receive the job as their progress argument and call
+    advance() as rows are parsed, classified and written.
+    """
+
+    def __init__(self, kind, filename):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.filename = filename
+        self.status = "queued"
+        self.progress = {"rows_parsed": 0, "rows_classified": 0, "rows_written": 0}
+        self.error = None
+        self.status_code = None
+        self.result = None
+        self.created_at = datetime.datetime.now().isoformat()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def advance(self, **counts):
+        with self._lock:
+            for key, count in counts.items():
+                self.progress[key] += count
+
+    def execute(self, func, *args):
+        """Run func(*args, progress=self) and record its result or error."""
+        with self._lock:
+            self.status = "running"
+        try:
+            result = func(*args, progress=self)
+        except HTTPException as e:
+            self._finish("failed", error=e.detail, status_code=e.status_code)
+        except Exception as e:
+            self._finish("failed", error=str(e), status_code=500)
+        else:
+            self._finish("done", result=result, status_code=200)
+
+    def _finish(self, status, **fields):
+        with self._lock:
+            self.status = status
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.finished_at = datetime.datetime.now().isoformat()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "filename": self.filename,
+                "status": self.status,
+                "progress": dict(self.progress),
+                "error": self.error,
+                "status_code": self.status_code,
+                "result": self.result,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+            }
+
+
+import_jobs = OrderedDict()
+import_jobs_lock = threading.Lock()
+
+
+def start_import_job(kind, filename, path, func, *args):
+    """Queue func(path, *args) on the import executor and return its job immediately.
+
+    The spooled upload at path, a file or a directory, is removed once the job has finished.
+    """
+    job = ImportJob(kind, filename)
+    with import_jobs_lock:
+        import_jobs[job.id] = job
+        while len(import_jobs) > IMPORT_JOB_HISTORY:
+            import_jobs.popitem(last=False)
+
+    def run():
+        try:
+            job.execute(func, path, *args)
+        finally:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+
+    executors["import"].submit(run)
+    return job
+
+
+class DatabaseWriter:
+    """Single writer thread that owns all mutations of the database.
+
+    Jobs are callables taking a connection. Queued jobs are run back to back in one
+    transaction and committed together (group commit); each job runs in its own
+    SAVEPOINT, so a failing job only rolls back its own changes and its caller gets
+    the exception. Jobs must not commit or roll back themselves.
+
+    Exclusive jobs (e.g. replacing the database file) run alone with no connection
+    open on the writer.
+    """
+
+    def __init__(self, pool, batch_size):
+        self.pool = pool
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._conn = None
+        self._conn_epoch = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, exclusive=False, **kwargs):
+        """Queue a job and return a concurrent.futures.Future for its result."""
+        future = Future()
+        self._queue.put((functools.partial(func, *args, **kwargs), exclusive, future))
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="db-writer", daemon=True
+                )
+                self._thread.start()
+        return future
+
+    def run(self, func, *args, **kwargs):
+        """Run a job and wait for it; for use from worker threads."""
+        return self.submit(func, *args, **kwargs).result()
+
+    async def execute(self, func, *args, **kwargs):
+        """Run a job and await it; for use from async endpoints."""
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    def _connection(self):
+        # Reconnect after the pool was reset (format/import replaced the file)
+        if self._conn is not None and self._conn_epoch != self.pool._epoch:
+            self._close()
+        if self._conn is None:
+            self._conn = self.pool._connect()
+            self._conn.isolation_level = None  # transactions are managed here
+            self._conn_epoch = self.pool._epoch
+        return self._conn
+
+    def _close(self):
+        if self._conn is not None:
+            self.pool._disconnect(self._conn)
+            self._conn = None
+
+    def _run(self):
+        pending = None
+        while True:
+            item, pending = pending or self._queue.get(), None
+            if item[1]:
+                self._run_exclusive(item)
+                continue
+            batch = [item]
+            # Group commit: take whatever else is already waiting, up to the batch size
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item[1]:
+                    pending = item  # exclusive jobs run after the current batch
+                    break
+                batch.append(item)
+            self._run_batch(batch)
+
+    def _run_exclusive(self, item):
+        job, _, future = item
+        self._close()
+        try:
+            future.set_result(job())
+        except BaseException as e:
+            future.set_exception(e)
+        query_cache.bump_generation()
+
+    def _run_batch(self, batch):
+        results = []
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            for job, _, future in batch:
+                conn.execute("SAVEPOINT job")
+                try:
+                    results.append((future, job(conn), None))
+                    conn.execute("RELEASE job")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    results.append((future, None, e))
+            conn.execute("COMMIT")
+        except Exception as e:
+            # The batch could not be committed: fail every job in it
+            if self._conn is not None and self._conn.in_transaction:
+                self._conn.rollback()
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            query_cache.bump_generation()
+            return
+        query_cache.bump_generation()
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+db_writer = DatabaseWriter(db_pool, WRITE_BATCH_SIZE)
+
+
 # SQLite database setup
 def create_database():
-    conn = sqlite3.connect("components.db")
-    cursor = conn.cursor()
+    conn = db_pool.acquire()
+    try:
+        cursor = conn.cursor()
 
+        create_tables(cursor)
+        create_search_index(cursor)
+        create_unit_value_columns(cursor)
+        migrate_schema(cursor)
+
+        conn.commit()
+    finally:
+        db_pool.release(conn)
+
+
+def create_tables(cursor):
     # Create components table
     cursor.execute(
         """
@@ -70,7 +570,11 @@ def create_database():
             voltage TEXT,
             tolerance TEXT,
             inductance TEXT,
-            current_power TEXT
+            current_power TEXT,
+            resistance_value REAL,
+            capacitance_value REAL,
+            voltage_value REAL,
+            inductance_value REAL
         )
     """
     )
@@ -103,11 +607,144 @@ def create_database():
     """
     )
 
-    conn.commit()
-    conn.close()
+
+# Pragmas for building a database file no other connection has open: a failed build is
+# thrown away, so it needs no rollback journal or fsyncs
+BULK_LOAD_PRAGMAS = {
+    "journal_mode": "OFF",
+    "synchronous": "OFF",
+    "cache_size": -262144,  # page cache size in KiB (~256 MB)
+    "temp_store": "MEMORY",
+}
+
+
+def shadow_database_path():
+    """Create an empty file next to DATABASE_PATH to build a replacement database in.
+
+    It is on the same file system as the live database, so os.replace() can swap it in.
+    """
+    fd, path = tempfile.mkstemp(
+        prefix=".components-",
+        suffix=".db",
+        dir=os.path.dirname(os.path.abspath(DATABASE_PATH)),
+    )
+    os.close(fd)
+    return path
+
+
+def build_shadow_database(path, load=None):
+    """Build a complete database in the file at path and return load's result.
+
+    load(conn) fills the bare tables; the search index, the secondary indexes and
+    the planner statistics are built after it, once over all rows instead of per
+    insert. Swap the file in with db_pool.replace_file().
+    """
+    conn = sqlite3.connect(path)
+    try:
+        for name, value in BULK_LOAD_PRAGMAS.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        cursor = conn.cursor()
+        create_tables(cursor)
+        result = load(conn) if load is not None else None
+        create_search_index(cursor)
+        create_unit_value_columns(cursor)
+        migrate_schema(cursor)
+        conn.commit()
+        # Switch the file to WAL now so the first pooled connection does not have to
+        conn.execute("PRAGMA journal_mode=WAL")
+        return result
+    finally:
+        conn.close()
+
+
+# Columns covered by the free-text search in /search_component
+SEARCH_COLUMNS = [
+    "part_number",
+    "manufacturer",
+    "description",
+    "component_type",
+    "component_branch",
+    "capacitance",
+    "resistance",
+    "voltage",
+    "tolerance",
+    "inductance",
+    "current_power",
+    "package",
+    "manufacture_part_number",
+    "storage_place",
+]
+
+# Set by create_search_index(); False when this SQLite build has no FTS5 trigram tokenizer
+FTS_AVAILABLE = False
+
+
+def create_search_index(cursor):
+    """Create the FTS5 index over SEARCH_COLUMNS and the triggers that keep it in sync.
+
+    The trigram tokenizer gives case-insensitive substring matching, i.e. the same
+    semantics as the LIKE '%term%' scan it replaces, for terms of 3+ characters.
+    """
+    global FTS_AVAILABLE
+    columns = ", ".join(SEARCH_COLUMNS)
+    new_values = ", ".join(f"new.{col}" for col in SEARCH_COLUMNS)
+    old_values = ", ".join(f"old.{col}" for col in SEARCH_COLUMNS)
+
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'components_fts'"
+    ).fetchone()
+    try:
+        cursor.execute(
+            f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS components_fts USING fts5(
+                {columns},
+                content='components',
+                content_rowid='id',
+                tokenize='trigram'
+            )
+        """
+        )
+    except sqlite3.OperationalError as e:
+        print(f"FTS5 search index unavailable, falling back to LIKE search: {e}")
+        FTS_AVAILABLE = False
+        return
+
+    cursor.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS components_fts_insert AFTER INSERT ON components BEGIN
+            INSERT INTO components_fts (rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    """
+    )
+    cursor.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS components_fts_delete AFTER DELETE ON components BEGIN
+            INSERT INTO components_fts (components_fts, rowid, {columns})
+            VALUES ('delete', old.id, {old_values});
+        END
+    """
+    )
+    # Only re-index when a searchable column changes, not on every stock movement
+    cursor.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS components_fts_update
+        AFTER UPDATE OF {columns} ON components BEGIN
+            INSERT INTO components_fts (components_fts, rowid, {columns})
+            VALUES ('delete', old.id, {old_values});
+            INSERT INTO components_fts (rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    """
+    )
+
+    if not exists:
+        # Index rows of a database created before the FTS table existed
+        cursor.execute("INSERT INTO components_fts (components_fts) VALUES ('rebuild')")
+    FTS_AVAILABLE = True
 
 
-create_database()
+def fts_phrase(term):
+    """Quote a search term as an FTS5 string so operators/punctuation are matched literally."""
+    return '"' + term.replace('"', '""') + '"'
 
 
 # Pydantic models for request bodies
@@ -173,13 +810,284 @@ def parse_unit_value(val):
     return num
 
 
+# Text parameter columns and the indexed SI float columns parsed from them
+UNIT_VALUE_COLUMNS = {
+    "resistance": "resistance_value",
+    "capacitance": "capacitance_value",
+    "voltage": "voltage_value",
+    "inductance": "inductance_value",
+}
+
+
+def unit_value_columns(record):
+    """Return {value_column: parsed float} for a component dict keyed by DB column names."""
+    return {
+        value_col: parse_unit_value(record.get(text_col))
+        for text_col, value_col in UNIT_VALUE_COLUMNS.items()
+    }
+
+
+def create_unit_value_columns(cursor):
+    """Add the *_value columns to databases created before they existed, backfill and index them."""
+    existing = {row[1] for row in cursor.execute("PRAGMA table_info(components)")}
+    missing = [col for col in UNIT_VALUE_COLUMNS.values() if col not in existing]
+    for col in missing:
+        cursor.execute(f"ALTER TABLE components ADD COLUMN {col} REAL")
+
+    if missing:
+        text_cols = list(UNIT_VALUE_COLUMNS)
+        rows = cursor.execute(
+            f"SELECT id, {', '.join(text_cols)} FROM components"
+        ).fetchall()
+        assignments = ", ".join(f"{col} = ?" for col in UNIT_VALUE_COLUMNS.values())
+        cursor.executemany(
+            f"UPDATE components SET {assignments} WHERE id = ?",
+            [
+                [parse_unit_value(value) for value in row[1:]] + [row[0]]
+                for row in rows
+            ],
+        )
+
+    for col in UNIT_VALUE_COLUMNS.values():
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_components_{col} ON components ({col})"
+        )
+
+
+# Indexes for the lookups the endpoints make besides id/part_number
+SECONDARY_INDEXES = {
+    # upload_bom matches BOM lines on manufacturer part numbers
+    "idx_components_manufacture_part_number": "components (manufacture_part_number)",
+    # branch_counts and the drawer assignment updates
+    "idx_components_type_branch": "components (component_type, component_branch)",
+    # get_storage_data and clear_all_drawers
+    "idx_components_storage_place": "components (storage_place)",
+    # get_changelog ordering and trimming
+    "idx_change_log_timestamp": "change_log (timestamp)",
+}
+
+
+def create_secondary_indexes(cursor):
+    for name, target in SECONDARY_INDEXES.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+
+
+def create_classification_cache(cursor):
+    """Table memoizing ComponentClassifier results per part number and description.
+
+    config_hash ties each row to the component_config.json it was classified with;
+    rows of any other config are ignored and purged on the next import.
+    """
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS classification_cache (
+            part_number TEXT NOT NULL,
+            description_hash TEXT NOT NULL,
+            config_hash TEXT NOT NULL,
+            component_type TEXT,
+            component_branch TEXT,
+            capacitance TEXT,
+            resistance TEXT,
+            voltage TEXT,
+            tolerance TEXT,
+            inductance TEXT,
+            current_power TEXT,
+            PRIMARY KEY (part_number, description_hash)
+        ) WITHOUT ROWID
+    """
+    )
+
+
+def create_cart_unique_index(cursor):
+    """Merge duplicate (user, component_id) cart rows and index the pair as UNIQUE.
+
+    The unique index serves cart lookups by user and by (user, component) and is
+    the conflict target of the bulk cart upserts.
+    """
+    cursor.execute(
+        """
+        UPDATE cart
+        SET quantity = (
+            SELECT SUM(d.quantity) FROM cart d
+            WHERE d.user IS cart.user AND d.component_id IS cart.component_id
+        )
+        WHERE id IN (
+            SELECT MIN(id) FROM cart GROUP BY user, component_id HAVING COUNT(*) > 1
+        )
+    """
+    )
+    cursor.execute(
+        "DELETE FROM cart WHERE id NOT IN (SELECT MIN(id) FROM cart GROUP BY user, component_id)"
+    )
+    cursor.execute("DROP INDEX IF EXISTS idx_cart_user_component")
+    cursor.execute(
+        "CREATE UNIQUE INDEX idx_cart_user_component ON cart (user, component_id)"
+    )
+
+
+# Values a missing BOM line can be substituted by: the indexed value column, the text
+# column shown, the parameter name in component_config.json and the designator letter
+SUBSTITUTE_KINDS = {
+    "resistance": ("resistance_value", "resistance", "Resistance", "R"),
+    "capacitance": ("capacitance_value", "capacitance", "Capacitance", "C"),
+    "inductance": ("inductance_value", "inductance", "Inductance", "L"),
+}
+# Ranked substitutes listed per BOM line not found
+SUBSTITUTE_SUGGESTIONS = 5
+
+
+def create_substitute_indexes(cursor):
+    """Index components by (branch, package, value) for each substitutable value kind."""
+    for kind, (value_col, _, _, _) in SUBSTITUTE_KINDS.items():
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_components_substitute_{kind} "
+            f"ON components (component_branch, UPPER(package), {value_col})"
+        )
+
+
+# Component columns a delta sync carries (those of /export_database); ids and the
+# parsed *_value columns are local to each database
+SYNC_COLUMNS = [
+    "part_number",
+    "manufacture_part_number",
+    "manufacturer",
+    "package",
+    "description",
+    "order_qty",
+    "unit_price",
+    "component_type",
+    "component_branch",
+    "storage_place",
+    "capacitance",
+    "resistance",
+    "voltage",
+    "tolerance",
+    "inductance",
+    "current_power",
+]
+
+
+def create_sync_log(cursor):
+    """Number every change of a component row from a sequence, for /sync_changes.
+
+    sync_state holds a random id of this database and the last sequence number;
+    component_sync holds one row per part number with the sequence number of its
+    creation and of its last change, and whether it has been deleted since. Both are
+    maintained by triggers, so every write path is covered. Existing rows are
+    recorded as created by one new sequence number.
+    """
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sync_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            database_id TEXT NOT NULL,
+            last_seq INTEGER NOT NULL
+        )
+    """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS component_sync (
+            part_number TEXT PRIMARY KEY,
+            created_seq INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            deleted INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_component_sync_seq ON component_sync (seq)"
+    )
+    cursor.execute(
+        "INSERT OR IGNORE INTO sync_state VALUES (1, lower(hex(randomblob(16))), 0)"
+    )
+    cursor.execute("UPDATE sync_state SET last_seq = last_seq + 1")
+    cursor.execute(
+        """
+        INSERT OR IGNORE INTO component_sync (part_number, created_seq, seq)
+        SELECT part_number, last_seq, last_seq FROM components, sync_state
+        WHERE part_number IS NOT NULL
+    """
+    )
+
+    # A part number that comes back after a delete counts as created again
+    record_new = """
+        UPDATE sync_state SET last_seq = last_seq + 1;
+        INSERT INTO component_sync (part_number, created_seq, seq)
+        SELECT new.part_number, last_seq, last_seq FROM sync_state
+        WHERE new.part_number IS NOT NULL
+        ON CONFLICT(part_number) DO UPDATE SET
+            created_seq = CASE WHEN deleted THEN excluded.created_seq ELSE created_seq END,
+            seq = excluded.seq,
+            deleted = 0;
+    """
+    columns = ", ".join(SYNC_COLUMNS)
+    old_values = ", ".join(f"old.{col}" for col in SYNC_COLUMNS)
+    new_values = ", ".join(f"new.{col}" for col in SYNC_COLUMNS)
+    cursor.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS components_sync_insert AFTER INSERT ON components
+        BEGIN {record_new} END
+    """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS components_sync_delete AFTER DELETE ON components
+        WHEN old.part_number IS NOT NULL BEGIN
+            UPDATE sync_state SET last_seq = last_seq + 1;
+            UPDATE component_sync SET seq = (SELECT last_seq FROM sync_state), deleted = 1
+            WHERE part_number = old.part_number;
+        END
+    """
+    )
+    # Only count updates that change a synced value, not writes of the same values
+    cursor.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS components_sync_update
+        AFTER UPDATE OF {columns} ON components
+        WHEN ({old_values}) IS NOT ({new_values}) BEGIN
+            {record_new}
+            UPDATE component_sync SET seq = (SELECT last_seq FROM sync_state), deleted = 1
+            WHERE part_number = old.part_number AND old.part_number IS NOT new.part_number;
+        END
+    """
+    )
+
+
+# Schema migrations, applied in order to databases whose PRAGMA user_version is older.
+# Each step must be safe on a database that already has its changes.
+SCHEMA_MIGRATIONS = [
+    (1, create_secondary_indexes),
+    (2, create_classification_cache),
+    (3, create_cart_unique_index),
+    (4, create_substitute_indexes),
+    (5, create_sync_log),
+]
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+
+def migrate_schema(cursor):
+    """Bring an existing database up to SCHEMA_VERSION without reformatting it."""
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    for target, migration in SCHEMA_MIGRATIONS:
+        if target > version:
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {target}")
+    if version < SCHEMA_VERSION:
+        # Refresh planner statistics for the new indexes
+        cursor.execute("ANALYZE")
+
+
+# Import workers only classify; the server process owns the database
+if not os.environ.get(IMPORT_WORKER_ENV):
+    create_database()
+
+
 # Endpoint to add a new component
 @app.post("/add_component")
 async def add_component(component: Component):
-    conn = sqlite3.connect("components.db")
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
+    def apply(conn):
+        conn.execute(
             """
             INSERT INTO components (
                 part_number,
@@ -197,8 +1105,12 @@ async def add_component(component: Component):
                 tolerance,
                 inductance,
                 current_power,
-                manufacture_part_number
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                manufacture_part_number,
+                resistance_value,
+                capacitance_value,
+                voltage_value,
+                inductance_value
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """,
             (
                 component.part_number,
@@ -217,53 +1129,213 @@ async def add_component(component: Component):
                 component.inductance,
                 component.current_power,
                 component.manufacture_part_number,
+                *unit_value_columns(
+                    {col: getattr(component, col) for col in UNIT_VALUE_COLUMNS}
+                ).values(),
             ),
         )
-        conn.commit()
+
+    try:
+        await db_writer.execute(apply)
     except sqlite3.IntegrityError as e:
-        conn.rollback()
         raise HTTPException(status_code=400, detail=str(e))
-    finally:
-        conn.close()
     return {"message": "Component added successfully."}
 
 
-# Endpoint to search for components
-@app.get("/search_component")
-async def search_component(
-    query: str,
-    component_type: Optional[str] = None,
-    component_branch: Optional[str] = None,
-    in_stock: Optional[bool] = False,
-    resistance_min: Optional[str] = None,
-    resistance_max: Optional[str] = None,
-    capacitance_min: Optional[str] = None,
-    capacitance_max: Optional[str] = None,
-    voltage_min: Optional[str] = None,
-    voltage_max: Optional[str] = None,
-    inductance_min: Optional[str] = None,
-    inductance_max: Optional[str] = None,
-):
-    conn = sqlite3.connect("components.db")
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+# --- Query result cache for read endpoints ---
+# Number of distinct (endpoint, parameters) results kept in memory
+QUERY_CACHE_SIZE = 256
 
-    sql_query = "SELECT * FROM components WHERE 1=1"
-    params = []
 
-    # Handle the search query terms with AND logic
-    if query and query.strip():
-        # Special handling for resistance pattern remains, but only if it's the *only* term
-        resistance_pattern = re.match(
-            r"^(\d+\.?\d*)\s*(ohm|Ω|ohms)$", query.strip(), re.IGNORECASE
-        )
+class QueryCache:
+    """In-process LRU cache of read-endpoint results.
 
-        if resistance_pattern and len(query.strip().split()) == 1:
-            # Extract the numeric value
-            value = resistance_pattern.group(1)
-            resistance_exact = f"{value}Ω"
-            resistance_exact_ohm = f"{value}ohm"
-            # Add specific resistance search condition
+    Entries are keyed by the normalized request parameters and the global write
+    generation; db_writer bumps the generation after every commit, which drops all
+    entries. Writes by other processes (e.g. the command-line importers) are caught
+    by comparing the inode, size and mtime of the database and WAL files on lookup.
+    """
+
+    def __init__(self, maxsize, path):
+        self.maxsize = maxsize
+        self.path = path
+        self.generation = 0
+        self._signature = self._file_signature()
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def bump_generation(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def _file_signature(self):
+        signature = []
+        for path in (self.path, self.path + "-wal"):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                signature.append(None)
+                continue
+            signature.append((st.st_ino, st.st_size, st.st_mtime_ns))
+        return tuple(signature)
+
+    def lookup(self, key):
+        """Return (found, value, generation) for key at the current write generation."""
+        signature = self._file_signature()
+        with self._lock:
+            if signature != self._signature:
+                # The files changed since the last lookup: some process wrote to them
+                self._signature = signature
+                self.generation += 1
+                self._entries.clear()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key], self.generation
+            self.misses += 1
+            return False, None, self.generation
+
+    def store(self, key, value, generation):
+        with self._lock:
+            # A write happened while the value was computed; it may already be stale
+            if generation != self.generation:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "generation": self.generation,
+            }
+
+
+query_cache = QueryCache(QUERY_CACHE_SIZE, DATABASE_PATH)
+
+
+def cached_query(name, normalize=None):
+    """Cache an async read endpoint in query_cache, keyed by its (normalized) arguments."""
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            # Empty query-string values behave like missing ones in every endpoint
+            params = {k: (None if v == "" else v) for k, v in bound.arguments.items()}
+            if normalize:
+                params = normalize(params)
+            key = (name, tuple(sorted(params.items())))
+
+            found, value, generation = query_cache.lookup(key)
+            if found:
+                return value
+            value = await func(*args, **kwargs)
+            query_cache.store(key, value, generation)
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+@app.get("/cache_stats")
+async def cache_stats():
+    return query_cache.stats()
+
+
+def normalize_search_params(params):
+    # Search terms are matched case-insensitively and split on whitespace
+    if params.get("query"):
+        params["query"] = " ".join(params["query"].lower().split())
+    return params
+
+
+# Upper bound for the page size of /search_component
+MAX_SEARCH_LIMIT = 1000
+
+
+def encode_cursor(data):
+    """Encode keyset position data as an opaque, URL-safe cursor string."""
+    raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor(); raises HTTP 400 when it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return data
+
+
+# Endpoint to search for components
+@app.get("/search_component")
+@cached_query("search_component", normalize=normalize_search_params)
+@offload("read")
+def search_component(
+    query: str,
+    component_type: Optional[str] = None,
+    component_branch: Optional[str] = None,
+    in_stock: Optional[bool] = False,
+    resistance_min: Optional[str] = None,
+    resistance_max: Optional[str] = None,
+    capacitance_min: Optional[str] = None,
+    capacitance_max: Optional[str] = None,
+    voltage_min: Optional[str] = None,
+    voltage_max: Optional[str] = None,
+    inductance_min: Optional[str] = None,
+    inductance_max: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_SEARCH_LIMIT),
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = False,
+):
+    """Search components.
+
+    Without `limit` all matches are returned as a list (legacy behaviour). With `limit`
+    the response is a page {"items", "next_cursor"[, "total"]} ordered by id; pass
+    `next_cursor` back as `cursor` to fetch the following page.
+    """
+    after_id = None
+    if cursor:
+        after_id = decode_cursor(cursor).get("id")
+        if not isinstance(after_id, int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    conn = db_pool.acquire()
+    db_cursor = conn.cursor()
+
+    sql_query = "SELECT * FROM components WHERE 1=1"
+    params = []
+
+    # Handle the search query terms with AND logic
+    if query and query.strip():
+        # Special handling for resistance pattern remains, but only if it's the *only* term
+        resistance_pattern = re.match(
+            r"^(\d+\.?\d*)\s*(ohm|Ω|ohms)$", query.strip(), re.IGNORECASE
+        )
+
+        if resistance_pattern and len(query.strip().split()) == 1:
+            # Extract the numeric value
+            value = resistance_pattern.group(1)
+            resistance_exact = f"{value}Ω"
+            resistance_exact_ohm = f"{value}ohm"
+            # Add specific resistance search condition
             sql_query += """ AND (
                 resistance LIKE ? OR 
                 resistance LIKE ? OR
@@ -277,38 +1349,34 @@ async def search_component(
             # --- Combined AND search logic ---
             search_terms = query.strip().lower().split()
 
-            search_columns = [
-                "part_number",  # Keep original case for potential exact matches if needed
-                "manufacturer",
-                "description",
-                "component_type",
-                "component_branch",
-                "capacitance",
-                "resistance",
-                "voltage",
-                "tolerance",
-                "inductance",
-                "current_power",
-                "package",
-                "manufacture_part_number",
-                "storage_place",
-            ]
+            # Terms of 3+ characters are matched through the FTS5 trigram index.
+            # Shorter ones cannot be indexed by trigrams, and terms containing LIKE
+            # wildcards (e.g. "±1%") keep the LIKE scan so they match as before.
+            fts_terms = []
 
             # For each search term, add an AND condition block
             for term in search_terms:
-                # Handle ohm/Ω variation within the term
+                # Handle ohm/Ω variation within the term (lower() turns Ω into ω)
                 term_variations = [term]
                 if "ohm" in term:
                     term_variations.append(term.replace("ohm", "Ω"))
-                elif "Ω" in term:
-                    term_variations.append(term.replace("Ω", "ohm"))
+                elif "Ω" in term or "ω" in term:
+                    term_variations.append(term.replace("Ω", "ohm").replace("ω", "ohm"))
+
+                if FTS_AVAILABLE and all(
+                    len(v) >= 3 and "%" not in v and "_" not in v for v in term_variations
+                ):
+                    fts_terms.append(
+                        "(" + " OR ".join(fts_phrase(v) for v in term_variations) + ")"
+                    )
+                    continue
 
                 # Build OR conditions for this term across all columns
                 term_conditions = []
                 term_params = []
                 for variation in term_variations:
                     pattern = f"%{variation}%"
-                    for col in search_columns:
+                    for col in SEARCH_COLUMNS:
                         term_conditions.append(f"LOWER({col}) LIKE ?")
                         term_params.append(pattern)
 
@@ -317,6 +1385,12 @@ async def search_component(
                     sql_query += f" AND ({' OR '.join(term_conditions)})"
                     params.extend(term_params)
 
+            if fts_terms:
+                sql_query += (
+                    " AND id IN (SELECT rowid FROM components_fts WHERE components_fts MATCH ?)"
+                )
+                params.append(" AND ".join(fts_terms))
+
     # Apply filters (remain single-select for now)
     if component_type:
         if component_type.lower() == "null":
@@ -334,54 +1408,72 @@ async def search_component(
     if in_stock:
         sql_query += " AND order_qty > 0"
 
-    # Execute query and fetch all
+    # --- Range filtering (unit-aware) on the indexed *_value columns ---
+    range_filters = [
+        ("resistance", resistance_min, resistance_max),
+        ("capacitance", capacitance_min, capacitance_max),
+        ("voltage", voltage_min, voltage_max),
+        ("inductance", inductance_min, inductance_max),
+    ]
+    for field, min_str, max_str in range_filters:
+        min_val = parse_unit_value(min_str) if min_str else None
+        max_val = parse_unit_value(max_str) if max_str else None
+        value_col = UNIT_VALUE_COLUMNS[field]
+        if min_val is not None and max_val is not None:
+            condition = f"{value_col} BETWEEN ? AND ?"
+            params.extend([min_val, max_val])
+        elif min_val is not None:
+            condition = f"{value_col} >= ?"
+            params.append(min_val)
+        elif max_val is not None:
+            condition = f"{value_col} <= ?"
+            params.append(max_val)
+        else:
+            continue
+        # Components whose value cannot be parsed are not excluded by range filters
+        sql_query += f" AND ({value_col} IS NULL OR {condition})"
+
+    # Total is counted over the filters only, before the keyset position is applied
+    count_query, count_params = f"SELECT COUNT(*) FROM ({sql_query})", list(params)
+
+    # Keyset pagination on the primary key gives a stable order across pages
+    if after_id is not None:
+        sql_query += " AND id > ?"
+        params.append(after_id)
+    sql_query += " ORDER BY id"
+    if limit:
+        # Fetch one extra row to know whether another page follows
+        sql_query += " LIMIT ?"
+        params.append(limit + 1)
+
+    # Execute query
+    total = None
     try:
-        cursor.execute(sql_query, params)
-        results = cursor.fetchall()
+        db_cursor.execute(sql_query, params)
+        results = db_cursor.fetchall()
+        if limit and include_total:
+            total = db_cursor.execute(count_query, count_params).fetchone()[0]
     except sqlite3.OperationalError as e:
         print(f"SQL Error: {e}")
         print(f"Query: {sql_query}")
         print(f"Params: {params}")
         raise HTTPException(status_code=500, detail=f"Database search error: {e}")
     finally:
-        conn.close()
+        db_pool.release(conn)
 
-    # --- Range filtering in Python (unit-aware) ---
-    def in_range(val, min_val, max_val):
-        v = parse_unit_value(val)
-        if min_val is not None and v is not None and v < min_val:
-            return False
-        if max_val is not None and v is not None and v > max_val:
-            return False
-        return True
-
-    # Parse min/max values
-    rmin = parse_unit_value(resistance_min) if resistance_min else None
-    rmax = parse_unit_value(resistance_max) if resistance_max else None
-    cmin = parse_unit_value(capacitance_min) if capacitance_min else None
-    cmax = parse_unit_value(capacitance_max) if capacitance_max else None
-    vmin = parse_unit_value(voltage_min) if voltage_min else None
-    vmax = parse_unit_value(voltage_max) if voltage_max else None
-    imin = parse_unit_value(inductance_min) if inductance_min else None
-    imax = parse_unit_value(inductance_max) if inductance_max else None
-
-    filtered = []
-    for row in results:
-        if resistance_min or resistance_max:
-            if not in_range(row["resistance"], rmin, rmax):
-                continue
-        if capacitance_min or capacitance_max:
-            if not in_range(row["capacitance"], cmin, cmax):
-                continue
-        if voltage_min or voltage_max:
-            if not in_range(row["voltage"], vmin, vmax):
-                continue
-        if inductance_min or inductance_max:
-            if not in_range(row["inductance"], imin, imax):
-                continue
-        filtered.append(dict(row))
+    if not limit:
+        return [dict(row) for row in results]
 
-    return filtered
+    items = [dict(row) for row in results[:limit]]
+    page = {
+        "items": items,
+        "next_cursor": (
+            encode_cursor({"id": items[-1]["id"]}) if len(results) > limit else None
+        ),
+    }
+    if include_total:
+        page["total"] = total
+    return page
 
 
 # Endpoint to serve the UI
@@ -390,479 +1482,1166 @@ async def serve_ui(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 
-# Endpoint to upload and update components from CSV
-@app.post("/update_components_from_csv")
-async def update_components_from_csv(
-    file: UploadFile = File(...), user: str = Query(...)
-):
-    if not file.filename.endswith(".csv"):
-        raise HTTPException(status_code=400, detail="Please upload a CSV file.")
+# Precompiled extractors for the parameters a branch lists in component_config.json
+PARAMETER_PATTERNS = {
+    "Resistance": re.compile(
+        r"(?<!\w)(\d+\.?\d*\s*[kKmM]?\s*(?:[ΩΩ]|Ohm))(?!\w)", re.IGNORECASE
+    ),
+    "Capacitance": re.compile(r"(\d+\.?\d*\s*[pPnNuUµμ]?F)", re.IGNORECASE),
+    "Inductance": re.compile(r"(\d+\.?\d*\s*[pPnNuUµμmM]?H)", re.IGNORECASE),
+    "Voltage": re.compile(r"(\d+\.?\d*\s*[Vv])"),
+    "Tolerance": re.compile(r"(±\d+%|\d+%)"),
+    "Current/Power": re.compile(
+        r"(\d+\.?\d*\s*[mMuU]?A|\d+\.?\d*\s*[mMkKuU]?W)", re.IGNORECASE
+    ),
+}
 
-    # Read the uploaded file
-    content = await file.read()
-    df = pd.read_csv(BytesIO(content), encoding="utf-8")
 
-    # Load component configurations
-    with open("component_config.json", "r") as f:
-        component_config = json.load(f)
-
-    # Define the required columns
-    required_columns = [
-        "LCSC Part Number",
-        "Manufacturer",
-        "Package",
-        "Description",
-        "Order Qty.",
-        "Unit Price($)",
-        "Component Type",
-        "Component Branch",
-        "Capacitance",
-        "Resistance",
-        "Voltage",
-        "Tolerance",
-        "Inductance",
-        "Current/Power",
-        "Storage Place",
-        "Manufacture Part Number",
-    ]
+# Non-ASCII letters that re.IGNORECASE also matches against ASCII ones
+CASE_FOLD = str.maketrans({"\u0130": "i", "\u0131": "i", "\u017f": "s", "\u212a": "k"})
 
-    # Initialize new columns with None
-    for col in required_columns:
-        if col not in df.columns:
-            df[col] = None
 
-    # Function to extract component details (same as before)
-    def extract_component_details(description):
-        component_type = None
-        component_branch = None
-        parameters = {}
-        storage_place = None
-
-        # Flatten component branches with their corresponding types
-        branches_with_types = []
-        for c_type, c_data in component_config.items():
-            for branch, branch_data in c_data["Component Branch"].items():
-                branches_with_types.append((branch, c_type, branch_data))
-
-        # Iterate over component branches
-        for branch, c_type, branch_data in branches_with_types:
-            if re.search(re.escape(branch), description, re.IGNORECASE):
-                component_branch = branch
-                component_type = c_type
-                # Extract parameters based on Parameters list
-                for param in branch_data["Parameters"]:
-                    if param == "Resistance":
-                        res_match = re.search(
-                            r"(?<!\w)(\d+\.?\d*\s*[kKmM]?\s*(?:[ΩΩ]|Ohm))(?!\w)",
-                            description,
-                            re.IGNORECASE,
-                        )
-                        if res_match:
-                            parameters["Resistance"] = res_match.group(1).strip()
-                    elif param == "Capacitance":
-                        cap_match = re.search(
-                            r"(\d+\.?\d*\s*[pPnNuUµμ]?F)", description, re.IGNORECASE
-                        )
-                        if cap_match:
-                            parameters["Capacitance"] = cap_match.group(1).strip()
-                    elif param == "Inductance":
-                        ind_match = re.search(
-                            r"(\d+\.?\d*\s*[pPnNuUµμmM]?H)", description, re.IGNORECASE
-                        )
-                        if ind_match:
-                            parameters["Inductance"] = ind_match.group(1).strip()
-                    elif param == "Voltage":
-                        volt_match = re.search(r"(\d+\.?\d*\s*[Vv])", description)
-                        if volt_match:
-                            parameters["Voltage"] = volt_match.group(1).strip()
-                    elif param == "Tolerance":
-                        tol_match = re.search(r"(±\d+%|\d+%)", description)
-                        if tol_match:
-                            parameters["Tolerance"] = tol_match.group(1).strip()
-                    elif param == "Current/Power":
-                        curr_match = re.search(
-                            r"(\d+\.?\d*\s*[mMuU]?A|\d+\.?\d*\s*[mMkKuU]?W)",
-                            description,
-                            re.IGNORECASE,
-                        )
-                        if curr_match:
-                            parameters["Current/Power"] = curr_match.group(1).strip()
-                storage_place = branch_data.get("Storage Place")
-                break
+class ComponentClassifier:
+    """Assign a component type/branch and parameters to a part description.
 
-        return component_type, component_branch, parameters, storage_place
+    All branch names of the config are compiled into one Aho-Corasick automaton, so a
+    description is scanned once no matter how many branches there are. Every node
+    stores the smallest config-order index of the branch names ending there, which
+    keeps the first-match-wins order of the old per-branch re.search loop.
+    """
 
-    # Apply the function to each row in the DataFrame
-    for index, row in df.iterrows():
-        desc = row.get("Description", "")
-        if isinstance(desc, str):
-            component_type, component_branch, parameters, storage_place = (
-                extract_component_details(desc)
-            )
-            df.at[index, "Component Type"] = component_type
-            df.at[index, "Component Branch"] = component_branch
-            df.at[index, "Storage Place"] = storage_place
-            for param, value in parameters.items():
-                df.at[index, param] = value
+    def __init__(self, component_config):
+        self.branches = [
+            (branch, c_type, branch_data)
+            for c_type, c_data in component_config.items()
+            for branch, branch_data in c_data["Component Branch"].items()
+        ]
+        self.storage_places = {
+            (c_type, branch): branch_data.get("Storage Place")
+            for branch, c_type, branch_data in self.branches
+        }
+        # Identifies the classification rules only: drawer assignments do not change
+        # what a description classifies as, so they keep memoized results valid
+        self.config_hash = hashlib.sha1(
+            json.dumps(
+                [
+                    (branch, c_type, branch_data["Parameters"])
+                    for branch, c_type, branch_data in self.branches
+                ]
+            ).encode("utf-8")
+        ).hexdigest()
+
+        # Trie of the case-folded branch names
+        self.goto = [{}]
+        self.output = [None]
+        for index, (branch, _, _) in enumerate(self.branches):
+            node = 0
+            for char in branch.translate(CASE_FOLD).lower():
+                if char not in self.goto[node]:
+                    self.goto.append({})
+                    self.output.append(None)
+                    self.goto[node][char] = len(self.goto) - 1
+                node = self.goto[node][char]
+            if self.output[node] is None:
+                self.output[node] = index
+
+        # Failure links (breadth first), merging the outputs of suffix nodes
+        self.fail = [0] * len(self.goto)
+        pending = deque(self.goto[0].values())
+        while pending:
+            node = pending.popleft()
+            suffix_output = self.output[self.fail[node]]
+            if suffix_output is not None and (
+                self.output[node] is None or suffix_output < self.output[node]
+            ):
+                self.output[node] = suffix_output
+            for char, child in self.goto[node].items():
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0) if node else 0
+                pending.append(child)
+
+    def match_branch(self, description):
+        """Return the index in self.branches of the first configured branch found, or None."""
+        goto, fail, output = self.goto, self.fail, self.output
+        best = output[0]  # an empty branch name matches everything
+        node = 0
+        for char in description.translate(CASE_FOLD).lower():
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            found = output[node]
+            if found is not None and (best is None or found < best):
+                best = found
+                if best == 0:
+                    break
+        return best
 
-    # Keep only the required columns
-    df = df[required_columns]
+    def classify(self, description):
+        """Return (component_type, component_branch, parameters, storage_place) for a description."""
+        index = self.match_branch(description)
+        if index is None:
+            return None, None, {}, None
 
-    # Fill missing 'Order Qty.' with zeros if necessary
-    df["Order Qty."] = df["Order Qty."].fillna(0).astype(int)
+        branch, c_type, branch_data = self.branches[index]
+        parameters = {}
+        for param in branch_data["Parameters"]:
+            pattern = PARAMETER_PATTERNS.get(param)
+            if pattern is None:
+                continue
+            match = pattern.search(description)
+            if match:
+                parameters[param] = match.group(1).strip()
+        return c_type, branch, parameters, branch_data.get("Storage Place")
 
-    # Now, proceed to insert/update the data in the database
-    required_fields = ["LCSC Part Number"]
-    errors = []
-    updated_components = []
-    changes_summary = []
-    changes_details = []
+    def classify_column(self, descriptions):
+        """Vectorized classify() over a Series of descriptions.
 
-    conn = sqlite3.connect("components.db")
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+        Returns a DataFrame, indexed like the string entries of descriptions, with the
+        "Component Type", "Component Branch", "Storage Place" and parameter columns.
+        A parameter is NaN where the row's branch does not list it or nothing matched.
+        """
+        is_text = descriptions.map(lambda value: isinstance(value, str))
+        text = descriptions[is_text].astype(object)
 
-    try:
-        cursor.execute("BEGIN TRANSACTION")
-
-        for index, row in df.iterrows():
-            missing_fields = []
-            for field in required_fields:
-                if pd.isna(row.get(field)):
-                    missing_fields.append(field)
-            if missing_fields:
-                errors.append(
-                    f"Row {index + 2}: Missing required fields: {', '.join(missing_fields)}"
-                )
-                continue
+        # One automaton scan per distinct description; -1 selects the trailing "no branch" entry
+        codes, uniques = pd.factorize(text)
+        matched = np.array(
+            [self.match_branch(description) for description in uniques], dtype=object
+        )
+        branch_index = np.where(matched == None, -1, matched).astype(int)[codes]  # noqa: E711
 
-            # Check if component already exists
-            cursor.execute(
-                "SELECT * FROM components WHERE part_number=?",
-                (row["LCSC Part Number"],),
-            )
-            existing_component = cursor.fetchone()
-
-            component_data = {
-                "part_number": row["LCSC Part Number"],
-                "storage_place": row.get("Storage Place"),
-                "order_qty": int(row["Order Qty."]),
-                "component_type": row.get("Component Type"),
-                "component_branch": row.get("Component Branch"),
-                "unit_price": row.get("Unit Price($)"),
-                "description": row.get("Description"),
-                "package": row.get("Package"),
-                "manufacturer": row.get("Manufacturer"),
-                "capacitance": row.get("Capacitance"),
-                "resistance": row.get("Resistance"),
-                "voltage": row.get("Voltage"),
-                "tolerance": row.get("Tolerance"),
-                "inductance": row.get("Inductance"),
-                "current_power": row.get("Current/Power"),
-                "manufacture_part_number": row.get("Manufacture Part Number"),
-            }
+        def lookup(values):
+            return np.array(list(values) + [None], dtype=object)[branch_index]
 
-            if existing_component:
-                # Update existing component
-                old_qty = existing_component["order_qty"]
-                new_qty = old_qty + component_data["order_qty"]
-                cursor.execute(
-                    """
-                    UPDATE components 
-                    SET order_qty = ?, 
-                        unit_price = COALESCE(?, unit_price),
-                        storage_place = COALESCE(?, storage_place)
-                    WHERE part_number = ?
-                """,
-                    (
-                        new_qty,
-                        component_data["unit_price"],
-                        component_data["storage_place"],
-                        component_data["part_number"],
-                    ),
-                )
+        result = pd.DataFrame(
+            {
+                "Component Type": lookup(c_type for _, c_type, _ in self.branches),
+                "Component Branch": lookup(branch for branch, _, _ in self.branches),
+                "Storage Place": lookup(
+                    branch_data.get("Storage Place") for _, _, branch_data in self.branches
+                ),
+            },
+            index=text.index,
+        )
 
-                changes_summary.append(
-                    f"Updated {component_data['part_number']}: +{component_data['order_qty']} to {new_qty}"
-                )
-                changes_details.append(
-                    {
-                        "part_number": component_data["part_number"],
-                        "old_qty": old_qty,
-                        "new_qty": new_qty,
-                        "action": "update",
-                    }
-                )
+        for param, pattern in PARAMETER_PATTERNS.items():
+            listed = np.array(
+                [param in branch_data["Parameters"] for _, _, branch_data in self.branches]
+                + [False]
+            )[branch_index]
+            extracted = text[listed].str.extract(pattern, expand=False).str.strip()
+            result[param] = extracted.reindex(text.index)
+        return result
 
-                # Get updated component
-                cursor.execute(
-                    "SELECT * FROM components WHERE part_number=?",
-                    (component_data["part_number"],),
-                )
-                updated_component = cursor.fetchone()
-                updated_components.append(dict(updated_component))
-            else:
-                # Insert new component
-                cursor.execute(
-                    """
-                    INSERT INTO components (
-                        part_number, storage_place, order_qty, component_type, component_branch,
-                        unit_price, description, package, manufacturer, capacitance,
-                        resistance, voltage, tolerance, inductance, current_power, manufacture_part_number
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                    (
-                        component_data["part_number"],
-                        component_data["storage_place"],
-                        component_data["order_qty"],
-                        component_data["component_type"],
-                        component_data["component_branch"],
-                        component_data["unit_price"],
-                        component_data["description"],
-                        component_data["package"],
-                        component_data["manufacturer"],
-                        component_data["capacitance"],
-                        component_data["resistance"],
-                        component_data["voltage"],
-                        component_data["tolerance"],
-                        component_data["inductance"],
-                        component_data["current_power"],
-                        component_data["manufacture_part_number"],
-                    ),
-                )
 
-                changes_summary.append(
-                    f"Added {component_data['part_number']}: {component_data['order_qty']} units"
-                )
-                changes_details.append(
-                    {
-                        "part_number": component_data["part_number"],
-                        "old_qty": 0,
-                        "new_qty": component_data["order_qty"],
-                        "action": "add",
-                    }
-                )
+_classifier_lock = threading.Lock()
+_classifier = None
+_classifier_stamp = None
 
-                # Get the inserted component
-                cursor.execute(
-                    "SELECT * FROM components WHERE part_number=?",
-                    (component_data["part_number"],),
-                )
-                new_component = cursor.fetchone()
-                updated_components.append(dict(new_component))
-
-        # Create a single changelog entry for the entire operation
-        new_items = len([c for c in changes_summary if c.startswith("Added")])
-        updated_items = len([c for c in changes_summary if c.startswith("Updated")])
-        summary = {
-            "summary": f"CSV Import: {new_items} new items, {updated_items} updated items",
-            "changes": changes_details,
-        }
 
-        cursor.execute(
-            """
-            INSERT INTO change_log (user, action_type, details)
-            VALUES (?, ?, ?)
-        """,
-            (user, "csv_import_batch", json.dumps(summary)),
-        )
+def get_classifier():
+    """Return the classifier for component_config.json, rebuilt only when the file changes."""
+    global _classifier, _classifier_stamp
+    stat = os.stat("component_config.json")
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with _classifier_lock:
+        if _classifier is None or _classifier_stamp != stamp:
+            with open("component_config.json", "r") as f:
+                _classifier = ComponentClassifier(json.load(f))
+            _classifier_stamp = stamp
+        return _classifier
 
-        conn.commit()
 
-        if errors:
-            raise HTTPException(status_code=400, detail="; ".join(errors))
+def description_hash(description):
+    return hashlib.sha1(description.encode("utf-8")).hexdigest()
 
-        return {
-            "message": f"Successfully processed {len(updated_components)} components",
-            "components": updated_components,
-        }
 
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
+# classification_cache column for each classifier parameter
+MEMO_PARAMETER_COLUMNS = {
+    param: param.lower().replace("/", "_") for param in PARAMETER_PATTERNS
+}
 
 
-@app.post("/update_order_quantity")
-async def update_order_quantity(data: dict):
-    id = data.get("id")
-    change = data.get("change")
-    user = data.get("user")
+class ClassificationMemo:
+    """ComponentClassifier.classify_column() backed by the classification_cache table.
 
-    if not id or not isinstance(change, (int, float)) or not user:
-        raise HTTPException(status_code=400, detail="ID, change, and user are required")
+    Rows whose part number and description were classified before under the same
+    config are answered from the table; only the others go through the classifier.
+    Their results are kept in self.pending until save() writes them.
+    """
 
-    conn = sqlite3.connect("components.db")
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    def __init__(self, conn, classifier):
+        self.conn = conn
+        self.classifier = classifier
+        self.pending = {}
+
+    def lookup(self, keys):
+        """Return {(part_number, description_hash): (type, branch, *parameters)} for cached keys."""
+        rows = self.conn.execute(
+            f"""
+            SELECT m.part_number, m.description_hash, m.component_type, m.component_branch,
+                   {", ".join(f"m.{col}" for col in MEMO_PARAMETER_COLUMNS.values())}
+            FROM json_each(?) k
+            JOIN classification_cache m
+              ON m.part_number = json_extract(k.value, '$[0]')
+             AND m.description_hash = json_extract(k.value, '$[1]')
+            WHERE m.config_hash = ?
+        """,
+            (json.dumps(keys), self.classifier.config_hash),
+        ).fetchall()
+        return {(row[0], row[1]): tuple(row[2:]) for row in rows}
 
-    try:
-        # Start transaction
-        cursor.execute("BEGIN TRANSACTION")
+    def classify_column(self, part_numbers, descriptions):
+        """Same result as ComponentClassifier.classify_column(descriptions)."""
+        keys, hits, misses = self.prepare(part_numbers, descriptions)
+        fresh = self.classifier.classify_column(misses)
+        return self.finish(descriptions, keys, hits, fresh)
 
-        # Get current component info
-        cursor.execute(
-            "SELECT order_qty, part_number FROM components WHERE id = ?", (id,)
-        )
-        result = cursor.fetchone()
+    def prepare(self, part_numbers, descriptions):
+        """Look a chunk up in the memo; returns (keys, hits, misses).
 
-        if not result:
-            raise HTTPException(status_code=404, detail="Component not found")
+        hits holds the classifications found (or None), misses the descriptions
+        still to be classified; pass both to finish() with the misses' result.
+        """
+        is_text = descriptions.map(lambda value: isinstance(value, str))
+        keyed = is_text & part_numbers.map(lambda value: isinstance(value, str))
+        keys = pd.Series(
+            list(zip(part_numbers[keyed], descriptions[keyed].map(description_hash))),
+            index=descriptions.index[keyed],
+            dtype=object,
+        )
+        unique = list(dict.fromkeys(keys))
+        cached = self.lookup(unique) if unique else {}
+        # Earlier chunks of the same import, not saved yet
+        cached.update((key, self.pending[key]) for key in unique if key in self.pending)
+
+        hits = None
+        hit_keys = keys[keys.map(lambda key: key in cached).astype(bool)]
+        if len(hit_keys):
+            hits = pd.DataFrame(
+                [cached[key] for key in hit_keys],
+                columns=["Component Type", "Component Branch", *MEMO_PARAMETER_COLUMNS],
+                index=hit_keys.index,
+                dtype=object,
+            )
+            hits.insert(
+                2,
+                "Storage Place",
+                [
+                    self.classifier.storage_places.get(key)
+                    for key in zip(hits["Component Type"], hits["Component Branch"])
+                ],
+            )
 
-        # Calculate new quantity
-        new_qty = max(0, result["order_qty"] + change)
+        misses = descriptions[is_text & ~descriptions.index.isin(hit_keys.index)]
+        return keys, hits, misses
 
-        # Update component quantity
-        cursor.execute(
-            """
-            UPDATE components 
-            SET order_qty = ? 
-            WHERE id = ?
-        """,
-            (new_qty, id),
-        )
+    def finish(self, descriptions, keys, hits, fresh):
+        """Combine hits with fresh, the classified misses, and remember the latter."""
+        frames = [] if hits is None else [hits]
+        if len(fresh) or not frames:
+            frames.append(fresh)
 
-        # Log the change
-        cursor.execute(
-            """
-            INSERT INTO change_log (user, action_type, component_id, part_number, details)
-            VALUES (?, ?, ?, ?, ?)
-        """,
-            (
-                user,
-                "update_quantity",
-                id,
-                result["part_number"],
-                f"Quantity changed by {change} to {new_qty}",
-            ),
+        learned = fresh.loc[keys.index.intersection(fresh.index)]
+        learned = learned.drop(columns="Storage Place").astype(object)
+        learned = learned.where(learned.notna(), None)
+        self.pending.update(
+            zip(keys[learned.index], learned.itertuples(index=False, name=None))
         )
 
-        # Get updated component
-        cursor.execute("SELECT * FROM components WHERE id = ?", (id,))
-        updated_component = cursor.fetchone()
+        is_text = descriptions.map(lambda value: isinstance(value, str))
+        result = frames[0] if len(frames) == 1 else pd.concat(frames)
+        return result.loc[descriptions.index[is_text]]
 
-        # Commit transaction
-        cursor.execute("COMMIT")
+    def rows(self):
+        """The pending results as classification_cache rows."""
+        return [
+            (part_number, digest, self.classifier.config_hash, *values)
+            for (part_number, digest), values in self.pending.items()
+        ]
 
-        return dict(updated_component)
+    def save(self, conn):
+        store_classifications(conn, self.classifier.config_hash, self.rows())
+        self.pending = {}
 
-    except Exception as e:
-        cursor.execute("ROLLBACK")
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
 
+def store_classifications(conn, config_hash, rows):
+    """Write classification_cache rows and drop those of any other config."""
+    conn.execute(
+        "DELETE FROM classification_cache WHERE config_hash <> ?", (config_hash,)
+    )
+    columns = [
+        "part_number",
+        "description_hash",
+        "config_hash",
+        "component_type",
+        "component_branch",
+        *MEMO_PARAMETER_COLUMNS.values(),
+    ]
+    conn.executemany(
+        f"INSERT OR REPLACE INTO classification_cache ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})",
+        rows,
+    )
 
-@app.post("/update_storage_place")
-async def update_storage_place(request: Request):
-    data = await request.json()
-    id = data.get("id")
-    storage_place = data.get("storage_place")
 
-    if not id:
-        raise HTTPException(status_code=400, detail="ID is required")
+@app.get("/import_jobs")
+async def list_import_jobs():
+    with import_jobs_lock:
+        jobs = list(import_jobs.values())
+    return [job.snapshot() for job in reversed(jobs)]
 
-    conn = sqlite3.connect("components.db")
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE components SET storage_place = ? WHERE id = ?", (storage_place, id)
-    )
-    conn.commit()
-    conn.close()
 
-    return {"message": "Storage place updated successfully"}
+@app.get("/import_jobs/{job_id}")
+async def get_import_job(job_id: str):
+    with import_jobs_lock:
+        job = import_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job.snapshot()
 
 
-@app.delete("/delete_component")
-async def delete_component(request: Request):
-    data = await request.json()
-    component_id = data.get("component_id")
-    user = data.get("user")
+# Endpoint to upload and update components from CSV
+@app.post("/update_components_from_csv")
+async def update_components_from_csv(
+    file: UploadFile = File(...),
+    user: str = Query(...),
+    stream: bool = Query(False),
+    background: bool = Query(False),
+    dry_run: bool = Query(False),
+):
+    if not file.filename.endswith(".csv"):
+        raise HTTPException(status_code=400, detail="Please upload a CSV file.")
 
-    conn = sqlite3.connect("components.db")
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    # Spool the upload to disk; it is parsed in chunks of IMPORT_CHUNK_ROWS rows
+    path = await spool_upload(file)
+    if dry_run:
+        func, args = preview_lcsc_csv, ()
+    else:
+        func, args = import_lcsc_csv, (user, stream)
+    if background:
+        job = start_import_job("update_components_from_csv", file.filename, path, func, *args)
+        return job.snapshot()
+    try:
+        return await run_blocking("import", func, path, *args)
+    finally:
+        os.remove(path)
+
+
+# Columns of an LCSC order CSV after classification
+LCSC_REQUIRED_COLUMNS = [
+    "LCSC Part Number",
+    "Manufacturer",
+    "Package",
+    "Description",
+    "Order Qty.",
+    "Unit Price($)",
+    "Component Type",
+    "Component Branch",
+    "Capacitance",
+    "Resistance",
+    "Voltage",
+    "Tolerance",
+    "Inductance",
+    "Current/Power",
+    "Storage Place",
+    "Manufacture Part Number",
+]
+
+
+# Pin the text columns to str so that every chunk parses them the same way,
+# e.g. a chunk of "0603" packages must not be inferred as the integer 603
+LCSC_TEXT_DTYPES = {
+    col: str for col in LCSC_REQUIRED_COLUMNS if col not in ("Order Qty.", "Unit Price($)")
+}
 
-    # Fetch the component
-    component = cursor.execute(
-        "SELECT * FROM components WHERE id=?", (component_id,)
-    ).fetchone()
-    if not component:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Component not found.")
 
-    part_number = component["part_number"]
+def add_lcsc_columns(df):
+    """Initialize the LCSC_REQUIRED_COLUMNS missing from df with None."""
+    for col in LCSC_REQUIRED_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
 
-    # Delete the component
-    cursor.execute("DELETE FROM components WHERE id=?", (component_id,))
-    conn.commit()
 
-    # Log the deletion in the change_log with a JSON payload so it can be reverted accurately
-    component_dict = dict(component)
-    # Convert any non-serialisable types (e.g. bytes) to str
-    safe_component_json = json.dumps({k: (v if not isinstance(v, bytes) else v.decode('utf-8')) for k, v in component_dict.items() if k != 'id'})
+def classify_lcsc_chunk(df, classifier, memo=None, classified=None):
+    """Classify a chunk of an LCSC order CSV, through memo when one is given.
 
-    cursor.execute(
-        """
-        INSERT INTO change_log (user, action_type, component_id, part_number, details)
-        VALUES (?, ?, ?, ?, ?)
-    """,
-        (
-            user,
-            "delete",
-            component_id,
-            part_number,
-            safe_component_json,
-        ),
-    )
+    classified, if given, is the classification of df["Description"] done already.
+    Returns (records, errors): component dicts keyed by DB column for the rows that
+    have a part number, and a message for every row that does not.
+    """
+    add_lcsc_columns(df)
+
+    # Classify all rows at once; rows without a string description are left as they are
+    if classified is None and memo is not None:
+        classified = memo.classify_column(df["LCSC Part Number"], df["Description"])
+    elif classified is None:
+        classified = classifier.classify_column(df["Description"])
+    for col in classified.columns:
+        df[col] = df[col].astype(object)
+    for col in ("Component Type", "Component Branch", "Storage Place"):
+        df.loc[classified.index, col] = classified[col]
+    for param in PARAMETER_PATTERNS:
+        found = classified[param].dropna()
+        df.loc[found.index, param] = found
 
-    conn.commit()
-    conn.close()
+    # Keep only the required columns
+    df = df[LCSC_REQUIRED_COLUMNS]
 
-    return {"message": "Component deleted successfully."}
+    # Fill missing 'Order Qty.' with zeros if necessary
+    df["Order Qty."] = df["Order Qty."].fillna(0).astype(int)
 
+    required_fields = ["LCSC Part Number"]
+    missing = df[required_fields].isna()
+    incomplete = missing.any(axis=1)
+    errors = [
+        f"Row {index + 2}: Missing required fields: {', '.join(missing.columns[row])}"
+        for index, row in zip(df.index[incomplete], missing[incomplete].to_numpy())
+    ]
 
-@app.get("/changelog", response_class=HTMLResponse)
-async def serve_changelog(request: Request):
-    return templates.TemplateResponse("changelog.html", {"request": request})
+    records = df[~incomplete].rename(columns=LCSC_COLUMN_MAPPING).to_dict("records")
+    for record in records:
+        record.update(unit_value_columns(record))
+    return records, errors
 
 
-@app.get("/get_changelog")
-async def get_changelog():
-    conn = sqlite3.connect("components.db")
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+def import_lcsc_csv(source, user, stream=False, progress=None):
+    """Classify the rows of an LCSC order CSV and add their quantities to the inventory.
 
-    # Get the most recent 100 changes
-    cursor.execute(
-        """
-        SELECT * FROM change_log 
-        ORDER BY timestamp DESC 
-        LIMIT 100
+    The file is read and classified IMPORT_CHUNK_ROWS rows at a time in the calling
+    thread and spooled, with the classifications learned, to a temporary SQLite
+    database. One writer job then stages and merges all rows and logs a single
+    csv_import_batch changelog entry, so the import is all-or-nothing and other
+    writes only wait for the merge, not for the parsing. With stream the response
+    only reports counts instead of listing every imported component, which keeps
+    memory use independent of the file size.
     """
-    )
-    logs = cursor.fetchall()
+    classifier = get_classifier()
+    # An empty name opens a private database on disk, deleted when it is closed
+    spool = sqlite3.connect("", check_same_thread=False)
+    create_classification_cache(spool.cursor())
+    stage_components(spool, [])
+
+    def merge(conn):
+        rows = spool.execute(
+            f"SELECT {', '.join(STAGE_COLUMNS)} FROM import_stage ORDER BY seq"
+        )
+        stage_components(conn, (dict(zip(STAGE_COLUMNS, row)) for row in rows))
+        merge_import_stage(conn)
+        components = [] if stream else staged_components(conn)
+        new_items, updated_items = log_import_changes(conn, user)
+        learned = spool.execute("SELECT * FROM classification_cache")
+        store_classifications(conn, classifier.config_hash, learned)
+        return components, new_items + updated_items
 
-    # Delete older entries
-    cursor.execute(
-        """
-        DELETE FROM change_log 
-        WHERE id NOT IN (
-            SELECT id FROM change_log 
-            ORDER BY timestamp DESC 
-            LIMIT 100
+    errors = []
+    staged = 0
+    conn = db_pool.acquire()
+    try:
+        memo = ClassificationMemo(conn, classifier)
+        chunks = pd.read_csv(
+            source, encoding="utf-8", dtype=LCSC_TEXT_DTYPES, chunksize=IMPORT_CHUNK_ROWS
+        )
+        for chunk in chunks:
+            if progress is not None:
+                progress.advance(rows_parsed=len(chunk))
+            records, chunk_errors = classify_lcsc_chunk(chunk, classifier, memo)
+            errors.extend(chunk_errors)
+            stage_components(spool, records, append=True)
+            staged += len(records)
+            # Spool the new classifications too, so memo.pending stays chunk-sized
+            store_classifications(spool, classifier.config_hash, memo.rows())
+            memo.pending = {}
+            if progress is not None:
+                progress.advance(rows_classified=len(records))
+        updated_components, processed = db_writer.run(merge)
+        if progress is not None:
+            progress.advance(rows_written=staged)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        db_pool.release(conn)
+        spool.close()
+
+    if errors:
+        raise HTTPException(status_code=400, detail="; ".join(errors))
+
+    result = {"message": f"Successfully processed {processed} components"}
+    if not stream:
+        result["components"] = updated_components
+    return result
+
+
+# Number of example rows listed per category by the dry-run previews
+DRY_RUN_SAMPLE_ROWS = 50
+
+
+def sample_rows(conn, sql, params=()):
+    """Return {"count", "items"} for a query: its total row count and the first rows."""
+    count = conn.execute(f"SELECT COUNT(*) FROM ({sql})", params).fetchone()[0]
+    rows = conn.execute(f"{sql} LIMIT ?", (*params, DRY_RUN_SAMPLE_ROWS)).fetchall()
+    return {"count": count, "items": [dict(row) for row in rows]}
+
+
+def preview_lcsc_csv(source, progress=None):
+    """Dry run of import_lcsc_csv: report what the file would change without writing.
+
+    The classified rows are staged in a temp table of a read connection and diffed
+    against components with set-based queries, so live data is never touched.
+    """
+    classifier = get_classifier()
+    conn = db_pool.acquire()
+    try:
+        errors = []
+        stage_components(conn, [])
+        # Reads memoized classifications but leaves storing new ones to real imports
+        memo = ClassificationMemo(conn, classifier)
+        chunks = pd.read_csv(
+            source, encoding="utf-8", dtype=LCSC_TEXT_DTYPES, chunksize=IMPORT_CHUNK_ROWS
+        )
+        for chunk in chunks:
+            records, chunk_errors = classify_lcsc_chunk(chunk, classifier, memo)
+            memo.pending = {}  # not stored by a preview; keep memory chunk-sized
+            errors.extend(chunk_errors)
+            stage_components(conn, records, append=True)
+            if progress is not None:
+                progress.advance(rows_parsed=len(chunk), rows_classified=len(records))
+
+        # One row per staged part number with its current and resulting quantity
+        conn.execute(
+            """
+            CREATE TEMP TABLE import_preview AS
+            SELECT
+                s.part_number,
+                s.added,
+                c.id IS NULL AS is_new,
+                COALESCE(c.order_qty, 0) AS old_qty,
+                COALESCE(c.order_qty, 0) + s.added AS new_qty,
+                first.component_type,
+                first.component_branch,
+                s.first_seq
+            FROM (
+                SELECT part_number, SUM(order_qty) AS added, MIN(seq) AS first_seq
+                FROM import_stage
+                GROUP BY part_number
+            ) s
+            JOIN import_stage first ON first.seq = s.first_seq
+            LEFT JOIN components c ON c.part_number = s.part_number
+        """
+        )
+        staged_rows, quantity_added = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(order_qty), 0) FROM import_stage"
+        ).fetchone()
+
+        return {
+            "dry_run": True,
+            "rows": staged_rows + len(errors),
+            "quantity_added": quantity_added,
+            "new_parts": sample_rows(
+                conn,
+                """
+                SELECT part_number, added AS order_qty, component_type, component_branch
+                FROM import_preview WHERE is_new ORDER BY first_seq
+            """,
+            ),
+            "updated_parts": sample_rows(
+                conn,
+                """
+                SELECT part_number, old_qty, new_qty
+                FROM import_preview WHERE NOT is_new ORDER BY first_seq
+            """,
+            ),
+            "unclassified_rows": sample_rows(
+                conn,
+                """
+                SELECT part_number, description
+                FROM import_stage WHERE component_type IS NULL ORDER BY seq
+            """,
+            ),
+            "errors": {"count": len(errors), "items": errors[:DRY_RUN_SAMPLE_ROWS]},
+        }
+    finally:
+        # End the staging transaction first so the drops are not rolled back with it
+        conn.rollback()
+        conn.execute("DROP TABLE IF EXISTS temp.import_preview")
+        conn.execute("DROP TABLE IF EXISTS temp.import_stage")
+        db_pool.release(conn)
+
+
+@app.post("/update_components_from_csv_batch")
+async def update_components_from_csv_batch(
+    files: List[UploadFile] = File(...),
+    user: str = Query(...),
+    background: bool = Query(False),
+):
+    for file in files:
+        if not file.filename.lower().endswith((".csv", ".zip")):
+            raise HTTPException(
+                status_code=400, detail=f"{file.filename}: please upload CSV or ZIP files."
+            )
+
+    spool_dir = tempfile.mkdtemp(prefix="easydrawers-batch-")
+    try:
+        sources = []
+        for file in files:
+            path = await spool_upload(file)
+            spooled = os.path.join(spool_dir, f"{len(sources)}-{os.path.basename(path)}")
+            shutil.move(path, spooled)
+            sources.append((file.filename, spooled))
+    except BaseException:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+        raise
+
+    if background:
+        job = start_import_job(
+            "update_components_from_csv_batch",
+            ", ".join(file.filename for file in files),
+            spool_dir,
+            import_lcsc_batch,
+            sources,
+            user,
+        )
+        return job.snapshot()
+    try:
+        return await run_blocking("import", import_lcsc_batch, spool_dir, sources, user)
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+
+# Worker processes that parse and classify batch imports; 0 uses one per CPU core
+IMPORT_PROCESSES = int(os.environ.get("EASYDRAWERS_IMPORT_PROCESSES", 0)) or os.cpu_count() or 1
+_import_process_pool = None
+_import_process_pool_lock = threading.Lock()
+
+
+def get_import_process_pool():
+    """Return the process pool for batch imports, starting it on first use.
+
+    Workers are spawned rather than forked: the server process runs several
+    threads, and a forked child could inherit one of their locks held. They are
+    marked through IMPORT_WORKER_ENV so importing this module there does not touch
+    the database.
+    """
+    global _import_process_pool
+    with _import_process_pool_lock:
+        if _import_process_pool is None:
+            os.environ[IMPORT_WORKER_ENV] = "1"  # inherited by the spawned workers
+            _import_process_pool = ProcessPoolExecutor(
+                max_workers=IMPORT_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _import_process_pool
+
+
+def discard_import_process_pool(pool):
+    global _import_process_pool
+    with _import_process_pool_lock:
+        if _import_process_pool is pool:
+            _import_process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def classify_descriptions(descriptions):
+    """ComponentClassifier.classify_column(); runs in the import process pool.
+
+    Workers never open the database: the caller answers what it can from the
+    classification memo and stores what the workers learned.
+    """
+    return get_classifier().classify_column(descriptions)
+
+
+def expand_import_sources(sources, work_dir):
+    """Replace ZIP archives in [(name, path)] by the CSV files they contain.
+
+    Members are written under generated names in work_dir, so paths inside an
+    archive never decide where anything is extracted.
+    """
+    expanded = []
+    for name, path in sources:
+        if not name.lower().endswith(".zip"):
+            expanded.append((name, path))
+            continue
+        try:
+            with zipfile.ZipFile(path) as archive:
+                for member in archive.infolist():
+                    if member.is_dir() or not member.filename.lower().endswith(".csv"):
+                        continue
+                    target = os.path.join(work_dir, f"{len(expanded)}-member.csv")
+                    with archive.open(member) as src, open(target, "wb") as dst:
+                        shutil.copyfileobj(src, dst)
+                    expanded.append((f"{name}/{member.filename}", target))
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=400, detail=f"{name}: not a valid ZIP file.")
+    return expanded
+
+
+def import_lcsc_batch(work_dir, sources, user, progress=None):
+    """Import many LCSC order CSVs (or ZIPs of them) at once.
+
+    The files are parsed and looked up in the classification memo here; the rows the
+    memo does not know are classified in parallel by the import process pool. All
+    files are then merged in file order inside one writer job, i.e. one transaction,
+    with one csv_import_batch changelog entry per file. If any file cannot be parsed,
+    nothing is written.
+    """
+    sources = expand_import_sources(sources, work_dir)
+    if not sources:
+        raise HTTPException(status_code=400, detail="No CSV files found in the upload.")
+
+    classifier = get_classifier()
+    pool = get_import_process_pool()
+    conn = db_pool.acquire()
+    try:
+        memo = ClassificationMemo(conn, classifier)
+        parsed = [(name, [], []) for name, _ in sources]
+        chunks = []  # (file index, chunk, keys, hits, future classifying the misses)
+        for index, (name, path) in enumerate(sources):
+            try:
+                reader = pd.read_csv(
+                    path,
+                    encoding="utf-8",
+                    dtype=LCSC_TEXT_DTYPES,
+                    chunksize=IMPORT_CHUNK_ROWS,
+                )
+                for chunk in reader:
+                    add_lcsc_columns(chunk)
+                    keys, hits, misses = memo.prepare(
+                        chunk["LCSC Part Number"], chunk["Description"]
+                    )
+                    future = pool.submit(classify_descriptions, misses)
+                    chunks.append((index, chunk, keys, hits, future))
+            except Exception as e:
+                for *_, pending in chunks:
+                    pending.cancel()
+                raise HTTPException(status_code=400, detail=f"{name}: {e}")
+
+        for index, chunk, keys, hits, future in chunks:
+            name, records, errors = parsed[index]
+            try:
+                fresh = future.result()
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                for *_, pending in chunks:
+                    pending.cancel()
+                raise HTTPException(status_code=400, detail=f"{name}: {e}")
+            classified = memo.finish(chunk["Description"], keys, hits, fresh)
+            chunk_records, chunk_errors = classify_lcsc_chunk(
+                chunk, classifier, classified=classified
+            )
+            records.extend(chunk_records)
+            errors.extend(chunk_errors)
+            if progress is not None:
+                progress.advance(
+                    rows_parsed=len(chunk_records) + len(chunk_errors),
+                    rows_classified=len(chunk_records),
+                )
+    except BrokenProcessPool as e:
+        # A worker died; start a fresh pool for the next batch
+        discard_import_process_pool(pool)
+        raise HTTPException(status_code=500, detail=f"Import worker failed: {e}")
+    finally:
+        db_pool.release(conn)
+    classifications = memo.rows()
+
+    def apply(conn):
+        files = []
+        for name, records, errors in parsed:
+            stage_components(conn, records)
+            merge_import_stage(conn)
+            new_items, updated_items = log_import_changes(conn, user)
+            if progress is not None:
+                progress.advance(rows_written=len(records))
+            files.append(
+                {
+                    "file": name,
+                    "new_items": new_items,
+                    "updated_items": updated_items,
+                    "errors": errors,
+                }
+            )
+        store_classifications(conn, classifier.config_hash, classifications)
+        return files
+
+    try:
+        files = db_writer.run(apply)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+        "message": f"Successfully processed {sum(len(r) for _, r, _ in parsed)} components from {len(files)} files",
+        "files": files,
+    }
+
+
+# Component column for each column of a classified LCSC order CSV
+LCSC_COLUMN_MAPPING = {
+    "LCSC Part Number": "part_number",
+    "Storage Place": "storage_place",
+    "Order Qty.": "order_qty",
+    "Component Type": "component_type",
+    "Component Branch": "component_branch",
+    "Unit Price($)": "unit_price",
+    "Description": "description",
+    "Package": "package",
+    "Manufacturer": "manufacturer",
+    "Capacitance": "capacitance",
+    "Resistance": "resistance",
+    "Voltage": "voltage",
+    "Tolerance": "tolerance",
+    "Inductance": "inductance",
+    "Current/Power": "current_power",
+    "Manufacture Part Number": "manufacture_part_number",
+}
+STAGE_COLUMNS = list(LCSC_COLUMN_MAPPING.values()) + list(UNIT_VALUE_COLUMNS.values())
+
+
+def stage_components(conn, records, append=False):
+    """Load component dicts into the temp table import_stage, numbered in file order by seq.
+
+    Unless append is set, rows staged earlier on this connection are dropped first.
+    """
+    if not append:
+        conn.execute("DROP TABLE IF EXISTS temp.import_stage")
+    conn.execute(
+        f"""
+        CREATE TEMP TABLE IF NOT EXISTS import_stage (
+            seq INTEGER PRIMARY KEY, {', '.join(STAGE_COLUMNS)}
+        )
+    """
+    )
+    conn.executemany(
+        f"""
+        INSERT INTO import_stage ({', '.join(STAGE_COLUMNS)})
+        VALUES ({', '.join('?' * len(STAGE_COLUMNS))})
+    """,
+        ([record[col] for col in STAGE_COLUMNS] for record in records),
+    )
+
+
+def merge_import_stage(conn):
+    """Add the staged rows to components with set-based SQL and record their quantity changes.
+
+    The result is that of applying the rows in file order: a new part number is
+    inserted with the columns of its first row, and every row adds its quantity and
+    fills in price and storage place. Existing parts are updated first and only the
+    new ones inserted, so no AUTOINCREMENT ids are used up by parts already there.
+    One (part_number, old_qty, new_qty, action) row per staged row is appended to the
+    temp table import_changes, which log_import_changes() turns into the
+    csv_import_batch changelog entry.
+    """
+    conn.execute(
+        """
+        CREATE TEMP TABLE IF NOT EXISTS import_changes (
+            seq INTEGER PRIMARY KEY, part_number, old_qty, new_qty, action
+        )
+    """
+    )
+    # Running per-part totals give each row's before/after quantity in one query
+    conn.execute(
+        """
+        INSERT INTO import_changes (part_number, old_qty, new_qty, action)
+        SELECT
+            s.part_number,
+            COALESCE(c.order_qty, 0) + SUM(s.order_qty) OVER w - s.order_qty,
+            COALESCE(c.order_qty, 0) + SUM(s.order_qty) OVER w,
+            CASE WHEN c.id IS NULL AND ROW_NUMBER() OVER w = 1 THEN 'add' ELSE 'update' END
+        FROM import_stage s
+        LEFT JOIN components c ON c.part_number = s.part_number
+        WINDOW w AS (PARTITION BY s.part_number ORDER BY s.seq ROWS UNBOUNDED PRECEDING)
+        ORDER BY s.seq
+    """
+    )
+
+    # Per part: total quantity, first row, and last rows with a price / storage place
+    conn.execute(
+        """
+        CREATE TEMP TABLE import_totals AS
+        SELECT
+            part_number,
+            SUM(order_qty) AS order_qty,
+            MIN(seq) AS first_seq,
+            MAX(CASE WHEN unit_price IS NOT NULL THEN seq END) AS price_seq,
+            MAX(CASE WHEN storage_place IS NOT NULL THEN seq END) AS place_seq
+        FROM import_stage
+        GROUP BY part_number
+    """
+    )
+    last_price = "(SELECT unit_price FROM import_stage WHERE seq = t.price_seq)"
+    last_place = "(SELECT storage_place FROM import_stage WHERE seq = t.place_seq)"
+    conn.execute(
+        f"""
+        UPDATE components AS c SET
+            order_qty = COALESCE(c.order_qty, 0) + t.order_qty,
+            unit_price = COALESCE({last_price}, c.unit_price),
+            storage_place = COALESCE({last_place}, c.storage_place)
+        FROM import_totals t
+        WHERE c.part_number = t.part_number
+    """
+    )
+    values = {
+        "order_qty": "t.order_qty",
+        "unit_price": last_price,
+        "storage_place": last_place,
+    }
+    conn.execute(
+        f"""
+        INSERT INTO components ({", ".join(STAGE_COLUMNS)})
+        SELECT {", ".join(values.get(col, f"s.{col}") for col in STAGE_COLUMNS)}
+        FROM import_totals t
+        JOIN import_stage s ON s.seq = t.first_seq
+        WHERE NOT EXISTS (SELECT 1 FROM components c WHERE c.part_number = t.part_number)
+        ORDER BY t.first_seq
+    """
+    )
+    conn.execute("DROP TABLE temp.import_totals")
+
+
+def log_import_changes(conn, user):
+    """Write the changes collected in import_changes as one csv_import_batch entry.
+
+    The JSON details are assembled by SQLite so the change list never has to be
+    held in Python. Drops the import temp tables and returns (new_items, updated_items).
+    """
+    conn.execute(
+        """
+        CREATE TEMP TABLE IF NOT EXISTS import_changes (
+            seq INTEGER PRIMARY KEY, part_number, old_qty, new_qty, action
+        )
+    """
+    )
+    new_items, updated_items = conn.execute(
+        """
+        SELECT COALESCE(SUM(action = 'add'), 0), COALESCE(SUM(action = 'update'), 0)
+        FROM import_changes
+    """
+    ).fetchone()
+    conn.execute(
+        """
+        INSERT INTO change_log (user, action_type, details)
+        SELECT ?, 'csv_import_batch', json_object(
+            'summary', ?,
+            'changes', json_group_array(json(change))
+        )
+        FROM (
+            SELECT json_object(
+                'part_number', part_number,
+                'old_qty', old_qty,
+                'new_qty', new_qty,
+                'action', action
+            ) AS change
+            FROM import_changes
+            ORDER BY seq
         )
+    """,
+        (user, f"CSV Import: {new_items} new items, {updated_items} updated items"),
+    )
+    conn.execute("DROP TABLE temp.import_changes")
+    conn.execute("DROP TABLE IF EXISTS temp.import_stage")
+    return new_items, updated_items
+
+
+def staged_components(conn):
+    """Return the current component row for every staged row, in file order."""
+    rows = conn.execute(
+        """
+        SELECT c.* FROM import_stage s
+        JOIN components c ON c.part_number = s.part_number
+        ORDER BY s.seq
+    """
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def adjust_stock(
+    conn, component_id, change, user, action_type="update_quantity", details=None, clamp=True
+):
+    """Apply a stock delta atomically and log it in the same writer job.
+
+    The new quantity is computed and stored by a single UPDATE ... RETURNING, so
+    concurrent adjustments cannot overwrite each other. With clamp the quantity is
+    floored at 0; without it the update only applies when enough stock is left.
+    Returns the updated component row, or None if nothing was updated.
     """
+    if clamp:
+        sql = """
+            UPDATE components
+            SET order_qty = MAX(0, COALESCE(order_qty, 0) + ?)
+            WHERE id = ?
+            RETURNING *
+        """
+        params = (change, component_id)
+    else:
+        sql = """
+            UPDATE components
+            SET order_qty = COALESCE(order_qty, 0) + ?
+            WHERE id = ? AND COALESCE(order_qty, 0) + ? >= 0
+            RETURNING *
+        """
+        params = (change, component_id, change)
+    rows = conn.execute(sql, params).fetchall()
+    if not rows:
+        return None
+    row = rows[0]
+
+    conn.execute(
+        """
+        INSERT INTO change_log (user, action_type, component_id, part_number, details)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+        (
+            user,
+            action_type,
+            component_id,
+            row["part_number"],
+            details or f"Quantity changed by {change} to {row['order_qty']}",
+        ),
+    )
+    return row
+
+
+@app.post("/update_order_quantity")
+async def update_order_quantity(data: dict):
+    id = data.get("id")
+    change = data.get("change")
+    user = data.get("user")
+
+    if not id or not isinstance(change, (int, float)) or not user:
+        raise HTTPException(status_code=400, detail="ID, change, and user are required")
+
+    def apply(conn):
+        updated_component = adjust_stock(conn, id, change, user)
+        if not updated_component:
+            raise HTTPException(status_code=404, detail="Component not found")
+        return dict(updated_component)
+
+    try:
+        return await db_writer.execute(apply)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/update_storage_place")
+async def update_storage_place(data: dict):
+    id = data.get("id")
+    storage_place = data.get("storage_place")
+
+    if not id:
+        raise HTTPException(status_code=400, detail="ID is required")
+
+    def apply(conn):
+        conn.execute(
+            "UPDATE components SET storage_place = ? WHERE id = ?", (storage_place, id)
+        )
+
+    await db_writer.execute(apply)
+
+    return {"message": "Storage place updated successfully"}
+
+
+@app.delete("/delete_component")
+async def delete_component(data: dict):
+    component_id = data.get("component_id")
+    user = data.get("user")
+
+    def apply(conn):
+        cursor = conn.cursor()
+
+        # Fetch the component
+        component = cursor.execute(
+            "SELECT * FROM components WHERE id=?", (component_id,)
+        ).fetchone()
+        if not component:
+            raise HTTPException(status_code=404, detail="Component not found.")
+
+        part_number = component["part_number"]
+
+        # Delete the component
+        cursor.execute("DELETE FROM components WHERE id=?", (component_id,))
+
+        # Log the deletion in the change_log with a JSON payload so it can be reverted accurately
+        component_dict = dict(component)
+        # Convert any non-serialisable types (e.g. bytes) to str
+        safe_component_json = json.dumps({k: (v if not isinstance(v, bytes) else v.decode('utf-8')) for k, v in component_dict.items() if k != 'id'})
+
+        cursor.execute(
+            """
+            INSERT INTO change_log (user, action_type, component_id, part_number, details)
+            VALUES (?, ?, ?, ?, ?)
+        """,
+            (
+                user,
+                "delete",
+                component_id,
+                part_number,
+                safe_component_json,
+            ),
+        )
+
+    await db_writer.execute(apply)
+
+    return {"message": "Component deleted successfully."}
+
+
+@app.get("/changelog", response_class=HTMLResponse)
+async def serve_changelog(request: Request):
+    return templates.TemplateResponse("changelog.html", {"request": request})
+
+
+# Number of change_log entries kept; older ones are deleted once the log is read
+CHANGELOG_RETENTION = 100
+
+
+def trim_changelog(conn):
+    """Delete all but the newest CHANGELOG_RETENTION change_log entries."""
+    conn.execute(
+        """
+        DELETE FROM change_log 
+        WHERE id NOT IN (
+            SELECT id FROM change_log 
+            ORDER BY timestamp DESC 
+            LIMIT ?
+        )
+    """,
+        (CHANGELOG_RETENTION,),
     )
-    conn.commit()
-    conn.close()
+
+
+@app.get("/get_changelog")
+@offload("read")
+def get_changelog():
+    conn = db_pool.acquire()
+    try:
+        cursor = conn.cursor()
+
+        # Get the most recent changes
+        cursor.execute(
+            """
+            SELECT * FROM change_log 
+            ORDER BY timestamp DESC 
+            LIMIT ?
+        """,
+            (CHANGELOG_RETENTION,),
+        )
+        logs = cursor.fetchall()
+        total = cursor.execute("SELECT COUNT(*) FROM change_log").fetchone()[0]
+    finally:
+        db_pool.release(conn)
+
+    # Delete older entries; reading the log alone does not go through the writer
+    if total > len(logs):
+        db_writer.run(trim_changelog)
 
     return [dict(log) for log in logs]
 
 
 @app.get("/component_config")
-async def get_component_config():
+@offload("read")
+def get_component_config():
     with open("component_config.json", "r") as f:
         config = json.load(f)
     return config
@@ -874,13 +2653,8 @@ async def revert_change(data: dict):
     if not log_id:
         raise HTTPException(status_code=400, detail="Log ID is required")
 
-    conn = sqlite3.connect("components.db")
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    try:
-        # Start transaction
-        cursor.execute("BEGIN TRANSACTION")
+    def apply(conn):
+        cursor = conn.cursor()
 
         # Get the change log entry
         cursor.execute("SELECT * FROM change_log WHERE id = ?", (log_id,))
@@ -916,6 +2690,8 @@ async def revert_change(data: dict):
                 component_details = json.loads(log_entry["details"])
             except json.JSONDecodeError:
                 raise HTTPException(status_code=400, detail="Cannot revert: legacy log entry without component details.")
+            # Older entries were logged before the *_value columns existed
+            component_details.update(unit_value_columns(component_details))
 
             # Build column/value lists dynamically (ignore id)
             cols = [k for k in component_details.keys() if k != "id"]
@@ -969,14 +2745,11 @@ async def revert_change(data: dict):
             ),
         )
 
-        conn.commit()
-        return {"message": "Change reverted successfully"}
-
+    try:
+        await db_writer.execute(apply)
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
+    return {"message": "Change reverted successfully"}
 
 
 # Cart endpoints
@@ -1012,10 +2785,9 @@ async def add_to_cart(data: dict):
             status_code=400, detail="Invalid quantity. Must be a positive integer."
         )
 
-    conn = sqlite3.connect("components.db")
-    cursor = conn.cursor()
+    def apply(conn):
+        cursor = conn.cursor()
 
-    try:
         # Check if item already exists in cart
         cursor.execute(
             """
@@ -1039,41 +2811,20 @@ async def add_to_cart(data: dict):
             )
 
         # --- NEW: immediately decrease stock quantity ---
-        cursor.execute("SELECT order_qty, part_number FROM components WHERE id = ?", (component_id,))
-        comp_row = cursor.fetchone()
-        if comp_row:
-            prev_qty = comp_row[0]
-            new_stock = max(0, prev_qty - quantity)
-            cursor.execute("UPDATE components SET order_qty = ? WHERE id = ?", (new_stock, component_id))
-
-            # log the change
-            cursor.execute(
-                """INSERT INTO change_log (user, action_type, component_id, part_number, details)
-                VALUES (?, ?, ?, ?, ?)""",
-                (
-                    user,
-                    "update_quantity",
-                    component_id,
-                    comp_row[1],
-                    f"Quantity changed by {-quantity} to {new_stock}",
-                ),
-            )
-
-        conn.commit()
-        return {"message": "Added to cart"}
+        adjust_stock(conn, component_id, -quantity, user)
 
+    try:
+        await db_writer.execute(apply)
     except Exception as e:
-        conn.rollback()
         print(f"Error in add_to_cart: {str(e)}")  # Debug log
         raise HTTPException(status_code=500, detail=f"Failed to add to cart: {str(e)}")
-    finally:
-        conn.close()
+    return {"message": "Added to cart"}
 
 
 @app.get("/get_cart")
-async def get_cart(user: str):
-    conn = sqlite3.connect("components.db")
-    conn.row_factory = sqlite3.Row
+@offload("read")
+def get_cart(user: str):
+    conn = db_pool.acquire()
     cursor = conn.cursor()
 
     try:
@@ -1107,7 +2858,7 @@ async def get_cart(user: str):
         print(f"Error in get_cart: {str(e)}")  # Add debug logging
         raise HTTPException(status_code=500, detail=str(e))
     finally:
-        conn.close()
+        db_pool.release(conn)
 
 
 @app.post("/update_cart_quantity")
@@ -1133,39 +2884,33 @@ async def update_cart_quantity(data: dict):
         f"Updating cart quantity: user={user}, item_id={cart_item_id}, quantity={quantity}"
     )  # Debug
 
-    conn = sqlite3.connect("components.db")
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        UPDATE cart
-        SET quantity = ?
-        WHERE id = ? AND user = ?
-    """,
-        (quantity, cart_item_id, user),
-    )
+    def apply(conn):
+        conn.execute(
+            """
+            UPDATE cart
+            SET quantity = ?
+            WHERE id = ? AND user = ?
+        """,
+            (quantity, cart_item_id, user),
+        )
 
-    conn.commit()
-    conn.close()
+    await db_writer.execute(apply)
 
     return {"message": f"Cart updated to quantity: {quantity}"}
 
 
 @app.delete("/remove_from_cart")
 async def remove_from_cart(cart_item_id: int, user: str):
-    conn = sqlite3.connect("components.db")
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        DELETE FROM cart
-        WHERE id = ? AND user = ?
-    """,
-        (cart_item_id, user),
-    )
+    def apply(conn):
+        conn.execute(
+            """
+            DELETE FROM cart
+            WHERE id = ? AND user = ?
+        """,
+            (cart_item_id, user),
+        )
 
-    conn.commit()
-    conn.close()
+    await db_writer.execute(apply)
 
     return {"message": "Item removed from cart"}
 
@@ -1178,11 +2923,9 @@ class CartAction(BaseModel):
 async def process_cart(data: CartAction):
     user = data.user
 
-    conn = sqlite3.connect("components.db")
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    def apply(conn):
+        cursor = conn.cursor()
 
-    try:
         # Get all cart items with component details
         cursor.execute(
             """
@@ -1201,66 +2944,46 @@ async def process_cart(data: CartAction):
 
         # Update quantities and create log entries
         for item in cart_items:
-            new_qty = item["order_qty"] - (item["cart_quantity"] or 1)
-            if new_qty < 0:
+            removed = item["cart_quantity"] or 1
+            if not adjust_stock(
+                conn,
+                item["id"],
+                -removed,
+                user,
+                action_type="cart_checkout",
+                details=f"Removed {removed} units from stock",
+                clamp=False,
+            ):
                 raise HTTPException(
                     status_code=400,
                     detail=f"Insufficient quantity for {item['part_number']}",
                 )
 
-            cursor.execute(
-                """
-                UPDATE components
-                SET order_qty = ?
-                WHERE id = ?
-            """,
-                (new_qty, item["id"]),
-            )
-
-            # Log the transaction
-            cursor.execute(
-                """
-                INSERT INTO change_log (user, action_type, component_id, part_number, details)
-                VALUES (?, 'cart_checkout', ?, ?, ?)
-            """,
-                (
-                    user,
-                    item["id"],
-                    item["part_number"],
-                    f"Removed {item['cart_quantity'] or 1} units from stock",
-                ),
-            )
-
         # Clear the user's cart
         cursor.execute("DELETE FROM cart WHERE user = ?", (user,))
 
-        conn.commit()
-        return {
-            "message": "Cart processed successfully",
-            "items": [dict(item) for item in cart_items],
-        }
+        return cart_items
 
+    try:
+        cart_items = await db_writer.execute(apply)
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
+    return {
+        "message": "Cart processed successfully",
+        "items": [dict(item) for item in cart_items],
+    }
 
 
 @app.post("/clear_cart")
 async def clear_cart(data: CartAction):
-    conn = sqlite3.connect("components.db")
-    cursor = conn.cursor()
+    def apply(conn):
+        conn.execute("DELETE FROM cart WHERE user = ?", (data.user,))
 
     try:
-        cursor.execute("DELETE FROM cart WHERE user = ?", (data.user,))
-        conn.commit()
-        return {"message": "Cart cleared"}
+        await db_writer.execute(apply)
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
+    return {"message": "Cart cleared"}
 
 
 # Add cart page route (add this before the other routes)
@@ -1275,22 +2998,20 @@ async def serve_map(request: Request):
 
 
 @app.get("/storage_data")
-async def get_storage_data():
-    conn = sqlite3.connect("components.db")
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+@cached_query("storage_data")
+@offload("read")
+def get_storage_data():
+    conn = db_pool.acquire()
+    try:
+        cursor = conn.cursor()
 
-    # Get all components with their storage locations
-    cursor.execute(
-        """
-        SELECT * FROM components 
-        WHERE storage_place IS NOT NULL 
-        AND storage_place != ''
-    """
-    )
+        # Get all components with their storage locations; "> ''" skips NULL and ''
+        # like "IS NOT NULL AND != ''" but can use idx_components_storage_place
+        cursor.execute("SELECT * FROM components WHERE storage_place > ''")
 
-    components = cursor.fetchall()
-    conn.close()
+        components = cursor.fetchall()
+    finally:
+        db_pool.release(conn)
 
     # Group components by storage location
     storage_data = defaultdict(list)
@@ -1305,411 +3026,1379 @@ async def serve_database(request: Request):
     return templates.TemplateResponse("database.html", {"request": request})
 
 
-@app.get("/export_database")
-async def export_database():
-    try:
-        conn = sqlite3.connect("components.db")
-        # Get all components from database
-        df = pd.read_sql_query("SELECT * FROM components", conn)
-
-        # Rename columns to match finalCart.csv format
-        column_mapping = {
-            "part_number": "LCSC Part Number",
-            "manufacture_part_number": "Manufacture Part Number",
-            "manufacturer": "Manufacturer",
-            "package": "Package",
-            "description": "Description",
-            "order_qty": "Order Qty.",
-            "unit_price": "Unit Price($)",
-            "component_type": "Component Type",
-            "component_branch": "Component Branch",
-            "storage_place": "Storage Place",
-            "capacitance": "Capacitance",
-            "resistance": "Resistance",
-            "voltage": "Voltage",
-            "tolerance": "Tolerance",
-            "inductance": "Inductance",
-            "current_power": "Current/Power",
-        }
+# Size of the pieces export_database writes to the response
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+# Media type and file extension of each /export_database format
+DATABASE_EXPORT_FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "jsonl": ("application/x-ndjson", ".jsonl"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+    "arrow": ("application/vnd.apache.arrow.file", ".arrow"),
+}
+
+# Type of the exported columns in the typed formats; all others are TEXT
+DATABASE_COLUMN_TYPES = {"order_qty": "INTEGER", "unit_price": "REAL"}
+
+
+def require_pyarrow(fmt):
+    if pa is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"The {fmt} format needs the optional pyarrow package (pip install pyarrow).",
+        )
+
+
+def export_columns(names=None):
+    """Return {db_column: export_column} for the requested columns, all by default.
+
+    Columns may be named by their export header ("Order Qty.") or DB column.
+    """
+    mapping = {db_col: csv_col for csv_col, db_col in DATABASE_CSV_COLUMNS.items()}
+    if not names:
+        return mapping
+    columns = {}
+    for name in names:
+        db_col = DATABASE_CSV_COLUMNS.get(name, name)
+        if db_col not in mapping:
+            raise HTTPException(status_code=400, detail=f"Unknown column: {name}")
+        columns[db_col] = mapping[db_col]
+    return columns
+
+
+def typed_select(columns):
+    """SELECT of components casting each column to its DATABASE_COLUMN_TYPES type.
+
+    Values that do not fit a numeric column (e.g. text in order_qty) become NULL.
+    """
+    expressions = []
+    for col in columns:
+        col_type = DATABASE_COLUMN_TYPES.get(col, "TEXT")
+        if col_type == "TEXT":
+            expressions.append(f"CAST({col} AS TEXT)")
+        else:
+            expressions.append(
+                f"CASE WHEN typeof({col}) IN ('integer', 'real') THEN CAST({col} AS {col_type}) END"
+            )
+    return f"SELECT {', '.join(expressions)} FROM components"
+
+
+def csv_export_pieces(columns):
+    """Yield the CSV export of components as text pieces.
+
+    Rows come straight from a cursor and are written with the csv module in the
+    dialect DataFrame.to_csv uses, so the bytes match the former pandas export.
+    That includes writing order_qty as floats when the column also holds NULLs or
+    REALs, as pandas read such a column as float64.
+    """
+    buffer = StringIO()
+    writer = csv.writer(buffer, lineterminator=os.linesep)
+    writer.writerow(columns.values())
+    conn = db_pool.acquire()
+    try:
+        has_text, has_float, has_number = conn.execute(
+            """
+            SELECT
+                COALESCE(MAX(typeof(order_qty) IN ('text', 'blob')), 0),
+                COALESCE(MAX(typeof(order_qty) IN ('real', 'null')), 0),
+                COALESCE(MAX(typeof(order_qty) IN ('integer', 'real')), 0)
+            FROM components
+        """
+        ).fetchone()
+        float_qty = has_float and has_number and not has_text
+        as_float = [float_qty and col == "order_qty" for col in columns]
+
+        cursor = conn.execute(f"SELECT {', '.join(columns)} FROM components")
+        while rows := cursor.fetchmany(1000):
+            for row in rows:
+                writer.writerow(
+                    [
+                        float(value) if convert and isinstance(value, int) else value
+                        for value, convert in zip(row, as_float)
+                    ]
+                )
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    finally:
+        db_pool.release(conn)
+
+
+def jsonl_export_pieces(columns):
+    """Yield components as JSON Lines, one typed object per row."""
+    names = list(columns.values())
+    conn = db_pool.acquire()
+    try:
+        cursor = conn.execute(typed_select(columns))
+        while rows := cursor.fetchmany(1000):
+            yield "".join(
+                json.dumps(dict(zip(names, row)), ensure_ascii=False) + "\n"
+                for row in rows
+            )
+    finally:
+        db_pool.release(conn)
+
+
+def encode_export(pieces, gzip=False):
+    """Join text pieces into UTF-8 chunks of about EXPORT_CHUNK_BYTES, gzipped on the fly."""
+    compressor = zlib.compressobj(wbits=31) if gzip else None  # 31: gzip container
+    pending = []
+    size = 0
+    try:
+        for piece in itertools.chain(pieces, [None]):
+            if piece is not None:
+                pending.append(piece)
+                size += len(piece)
+                if size < EXPORT_CHUNK_BYTES:
+                    continue
+            data = "".join(pending).encode("utf-8")
+            pending = []
+            size = 0
+            if compressor is not None:
+                data = compressor.compress(data)
+            if data:
+                yield data
+        if compressor is not None:
+            yield compressor.flush()
+    finally:
+        pieces.close()
+
+
+def write_arrow_export(conn, columns, fmt, sink):
+    """Write components to sink as a Parquet or Arrow IPC file, IMPORT_CHUNK_ROWS rows per batch."""
+    arrow_types = {"TEXT": pa.string(), "INTEGER": pa.int64(), "REAL": pa.float64()}
+    schema = pa.schema(
+        [
+            (name, arrow_types[DATABASE_COLUMN_TYPES.get(col, "TEXT")])
+            for col, name in columns.items()
+        ]
+    )
+    writer = pq.ParquetWriter(sink, schema) if fmt == "parquet" else pa.ipc.new_file(sink, schema)
+    with writer:
+        cursor = conn.execute(typed_select(columns))
+        while rows := cursor.fetchmany(IMPORT_CHUNK_ROWS):
+            writer.write_batch(
+                pa.record_batch(
+                    [
+                        pa.array([row[i] for row in rows], type=field.type)
+                        for i, field in enumerate(schema)
+                    ],
+                    schema=schema,
+                )
+            )
+
+
+def file_chunks(f):
+    """Yield the contents of an open file in EXPORT_CHUNK_BYTES chunks, then close it."""
+    try:
+        f.seek(0)
+        while data := f.read(EXPORT_CHUNK_BYTES):
+            yield data
+    finally:
+        f.close()
+
+
+@app.get("/export_database")
+@offload("read")
+def export_database(
+    fmt: str = Query("csv", alias="format"),
+    columns: Optional[List[str]] = Query(None),
+    gzip: bool = Query(False),
+):
+    """Stream components in the column layout import_database reads.
+
+    csv and jsonl are streamed from a cursor (gzipped on the fly with gzip);
+    parquet and arrow are typed columnar files and need pyarrow. columns limits
+    the export to the given columns.
+    """
+    if fmt not in DATABASE_EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown format: {fmt}. Use one of {', '.join(DATABASE_EXPORT_FORMATS)}.",
+        )
+    if fmt in ("parquet", "arrow"):
+        require_pyarrow(fmt)
+        if gzip:
+            raise HTTPException(
+                status_code=400, detail=f"gzip applies to csv and jsonl; {fmt} is compressed internally."
+            )
+    columns = export_columns(columns)
+    media_type, extension = DATABASE_EXPORT_FORMATS[fmt]
+    filename = f"component_database_{datetime.datetime.now().strftime('%Y%m%d')}{extension}"
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    if fmt == "csv":
+        body = encode_export(csv_export_pieces(columns), gzip)
+    elif fmt == "jsonl":
+        body = encode_export(jsonl_export_pieces(columns), gzip)
+    else:
+        # Columnar files end with their metadata, so they are built before sending
+        sink = tempfile.TemporaryFile(prefix="easydrawers-export-")
+        conn = db_pool.acquire()
+        try:
+            write_arrow_export(conn, columns, fmt, sink)
+        except Exception as e:
+            sink.close()
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            db_pool.release(conn)
+        body = file_chunks(sink)
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+@app.post("/format_database")
+async def format_database():
+    shadow_path = shadow_database_path()
+    try:
+        # Build the empty database aside, then swap it in as an exclusive writer job:
+        # no other write can run while the file is replaced
+        await run_blocking("import", build_shadow_database, shadow_path)
+        await db_writer.execute(db_pool.replace_file, shadow_path, exclusive=True)
+        return {"message": "Database formatted successfully"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        remove_database_files(shadow_path)
+
+
+@app.post("/import_database")
+async def import_database(
+    file: UploadFile = File(...),
+    background: bool = Query(False),
+    dry_run: bool = Query(False),
+):
+    fmt = database_file_format(file.filename)
+    if fmt is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Please upload a CSV, JSON Lines, Parquet or Arrow file.",
+        )
+    if fmt in ("parquet", "arrow"):
+        require_pyarrow(fmt)
+
+    # Spool the uploaded file to disk; it is parsed in chunks
+    path = await spool_upload(file)
+    func = functools.partial(
+        preview_database_csv if dry_run else import_database_csv, fmt=fmt
+    )
+    if background:
+        job = start_import_job("import_database", file.filename, path, func)
+        return job.snapshot()
+    try:
+        return await run_blocking("import", func, path)
+    finally:
+        os.remove(path)
+
+
+# Expected columns based on the export function, mapped to the database schema
+DATABASE_CSV_COLUMNS = {
+    "LCSC Part Number": "part_number",
+    "Manufacture Part Number": "manufacture_part_number",
+    "Manufacturer": "manufacturer",
+    "Package": "package",
+    "Description": "description",
+    "Order Qty.": "order_qty",
+    "Unit Price($)": "unit_price",
+    "Component Type": "component_type",
+    "Component Branch": "component_branch",
+    "Storage Place": "storage_place",
+    "Capacitance": "capacitance",
+    "Resistance": "resistance",
+    "Voltage": "voltage",
+    "Tolerance": "tolerance",
+    "Inductance": "inductance",
+    "Current/Power": "current_power",
+}
+
+
+# Database file format for each file extension import_database accepts; CSV and
+# JSON Lines may also be gzipped (".gz" after the extension)
+DATABASE_FILE_FORMATS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+}
+
+
+def database_file_format(filename):
+    """Return the format of an export file name, e.g. "csv" or "jsonl.gz", or None."""
+    name = filename.lower()
+    gzipped = name.endswith(".gz")
+    if gzipped:
+        name = name[: -len(".gz")]
+    for extension, fmt in DATABASE_FILE_FORMATS.items():
+        if name.endswith(extension):
+            if not gzipped:
+                return fmt
+            return f"{fmt}.gz" if fmt in ("csv", "jsonl") else None
+    return None
+
+
+def database_file_columns(source, fmt="csv"):
+    """Return the column names of a database export file."""
+    base, _, gzipped = fmt.partition(".")
+    compression = "gzip" if gzipped else None
+    if base == "csv":
+        return list(pd.read_csv(source, encoding="utf-8", nrows=0, compression=compression).columns)
+    if base == "jsonl":
+        return list(
+            pd.read_json(
+                source, lines=True, nrows=1, dtype=False, convert_dates=False, compression=compression
+            ).columns
+        )
+    if base == "parquet":
+        return pq.read_schema(source).names
+    with pa.memory_map(source) as f:
+        return pa.ipc.open_file(f).schema.names
+
+
+def read_database_file(source, fmt="csv"):
+    """Yield DataFrames of up to IMPORT_CHUNK_ROWS rows of a database export file.
+
+    The columnar formats only read the export columns; their types come from the
+    file instead of being inferred per chunk.
+    """
+    base, _, gzipped = fmt.partition(".")
+    compression = "gzip" if gzipped else None
+    if base == "csv":
+        # Text columns are pinned to str so every chunk parses them the same way
+        text_dtypes = {
+            col: str
+            for col, db_col in DATABASE_CSV_COLUMNS.items()
+            if db_col not in DATABASE_COLUMN_TYPES
+        }
+        yield from pd.read_csv(
+            source,
+            encoding="utf-8",
+            dtype=text_dtypes,
+            chunksize=IMPORT_CHUNK_ROWS,
+            compression=compression,
+        )
+    elif base == "jsonl":
+        with pd.read_json(
+            source,
+            lines=True,
+            dtype=False,
+            convert_dates=False,
+            precise_float=True,
+            chunksize=IMPORT_CHUNK_ROWS,
+            compression=compression,
+        ) as reader:
+            yield from reader
+    elif base == "parquet":
+        for batch in pq.ParquetFile(source).iter_batches(
+            batch_size=IMPORT_CHUNK_ROWS, columns=list(DATABASE_CSV_COLUMNS)
+        ):
+            yield batch.to_pandas()
+    else:
+        with pa.memory_map(source) as f:
+            reader = pa.ipc.open_file(f)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i).select(list(DATABASE_CSV_COLUMNS))
+                yield batch.to_pandas()
+
+
+def check_database_csv_columns(source, fmt="csv"):
+    """Raise a 400 HTTPException unless the file has exactly the export columns."""
+    header = database_file_columns(source, fmt)
+    expected_columns = list(DATABASE_CSV_COLUMNS)
+    if not all(col in header for col in expected_columns):
+        missing = [col for col in expected_columns if col not in header]
+        extra = [col for col in header if col not in expected_columns]
+        error_msg = "CSV columns do not match the expected format."
+        if missing:
+            error_msg += f" Missing: {', '.join(missing)}."
+        if extra:
+            error_msg += f" Unexpected: {', '.join(extra)}."
+        raise HTTPException(status_code=400, detail=error_msg)
+
+
+def load_database_file(conn, source, db_columns, progress=None, fmt="csv"):
+    """Parse an export file chunk by chunk into the table components of conn.
+
+    Returns the number of rows inserted; the caller commits.
+    """
+    placeholders = ", ".join(["?"] * len(db_columns))
+    sql = f"INSERT INTO components ({', '.join(db_columns)}) VALUES ({placeholders})"
+
+    loaded = 0
+    for chunk in read_database_file(source, fmt):
+        df_renamed = chunk.rename(columns=DATABASE_CSV_COLUMNS)
+
+        # Convert relevant columns to appropriate types
+        df_renamed["order_qty"] = (
+            pd.to_numeric(df_renamed["order_qty"], errors="coerce")
+            .fillna(0)
+            .astype(int)
+        )
+        df_renamed["unit_price"] = (
+            pd.to_numeric(df_renamed["unit_price"], errors="coerce")
+            .fillna(0.0)
+            .astype(float)
+        )
+
+        # Parsed SI values for the indexed range-filter columns
+        for text_col, value_col in UNIT_VALUE_COLUMNS.items():
+            df_renamed[value_col] = df_renamed[text_col].map(parse_unit_value)
+
+        # Convert DataFrame to list of tuples for executemany
+        conn.executemany(sql, [tuple(x) for x in df_renamed[db_columns].to_numpy()])
+        loaded += len(chunk)
+        if progress is not None:
+            progress.advance(rows_parsed=len(chunk))
+    return loaded
+
+
+def stage_database_csv(source, stage_path, db_columns, progress=None, fmt="csv"):
+    """Parse an export file into the table components of a scratch SQLite file.
+
+    Returns the number of staged rows.
+    """
+    stage = sqlite3.connect(stage_path)
+    try:
+        stage.execute("PRAGMA journal_mode = OFF")
+        stage.execute("PRAGMA synchronous = OFF")
+        stage.execute(f"CREATE TABLE components ({', '.join(db_columns)})")
+        staged = load_database_file(stage, source, db_columns, progress, fmt)
+        stage.commit()
+        return staged
+    finally:
+        stage.close()
+
+
+def import_database_csv(source, progress=None, fmt="csv", in_place=False):
+    """Replace the inventory with the contents of a file produced by /export_database.
+
+    The new database is built in a shadow file while readers keep seeing the old one,
+    then swapped in; a malformed file leaves the live database untouched. With
+    in_place (the command line, which may run next to the server) the rows are
+    staged in the shadow file instead and replace the live rows in one transaction,
+    so no other process loses the file it has open.
+    """
+    shadow_path = shadow_database_path()
+    try:
+        # Verify columns match before parsing the rest of the file
+        check_database_csv_columns(source, fmt)
+
+        # Get list of columns in the correct order for the database table
+        db_columns = list(DATABASE_CSV_COLUMNS.values()) + list(UNIT_VALUE_COLUMNS.values())
+        if in_place:
+            staged = stage_database_csv(source, shadow_path, db_columns, progress, fmt)
+            db_writer.run(replace_components, shadow_path, db_columns, exclusive=True)
+        else:
+            staged = build_shadow_database(
+                shadow_path,
+                lambda conn: load_database_file(conn, source, db_columns, progress, fmt),
+            )
+            # Exclusive writer job: no other write can run while the file is replaced
+            db_writer.run(db_pool.replace_file, shadow_path, exclusive=True)
+        if progress is not None:
+            progress.advance(rows_written=staged)
+
+        return {
+            "message": f"Database imported successfully. {staged} records added."
+        }
+
+    except HTTPException:
+        raise
+    except pd.errors.EmptyDataError:
+        raise HTTPException(status_code=400, detail="The uploaded CSV file is empty.")
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error processing CSV file: {str(e)}"
+        )
+    finally:
+        remove_database_files(shadow_path)
+
+
+def replace_components(stage_path, db_columns):
+    """Replace all components with the rows staged by stage_database_csv(), in one transaction.
+
+    The cart and the changelog are cleared as well, as when the file is swapped.
+    Runs as an exclusive writer job: ATTACH is not possible inside its transactions.
+    """
+    columns = ", ".join(db_columns)
+    conn = db_pool.acquire()
+    conn.execute("ATTACH DATABASE ? AS import_source", (stage_path,))
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for table in ("cart", "change_log", "components"):
+            conn.execute(f"DELETE FROM main.{table}")
+        # Number the new rows from 1, as in a new database
+        conn.execute(
+            "DELETE FROM main.sqlite_sequence WHERE name IN ('cart', 'change_log', 'components')"
+        )
+        conn.execute(
+            f"""
+            INSERT INTO main.components ({columns})
+            SELECT {columns} FROM import_source.components ORDER BY rowid
+        """
+        )
+        conn.commit()
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.execute("DETACH DATABASE import_source")
+        db_pool.release(conn)
+
+
+def preview_database_csv(source, progress=None, fmt="csv"):
+    """Dry run of import_database_csv: diff the file against the live inventory.
+
+    The file is staged into a scratch SQLite file as for the real import, attached to a
+    read connection and compared with components by part number in set-based queries.
+    """
+    check_database_csv_columns(source, fmt)
+    stage_dir = tempfile.mkdtemp(prefix="easydrawers-import-")
+    stage_path = os.path.join(stage_dir, "stage.db")
+    try:
+        db_columns = list(DATABASE_CSV_COLUMNS.values()) + list(UNIT_VALUE_COLUMNS.values())
+        staged = stage_database_csv(source, stage_path, db_columns, progress, fmt)
+
+        conn = db_pool.acquire()
+        conn.execute("ATTACH DATABASE ? AS import_source", (stage_path,))
+        try:
+            conn.execute(
+                "CREATE INDEX import_source.idx_stage_part_number ON components (part_number)"
+            )
+            changed_columns = [
+                col for col in DATABASE_CSV_COLUMNS.values() if col != "part_number"
+            ]
+            differs = " OR ".join(f"s.{col} IS NOT c.{col}" for col in changed_columns)
+            differing_columns = " || ".join(
+                f"CASE WHEN s.{col} IS NOT c.{col} THEN '{col},' ELSE '' END"
+                for col in changed_columns
+            )
+            result = {
+                "dry_run": True,
+                "rows": staged,
+                "added": sample_rows(
+                    conn,
+                    """
+                    SELECT s.part_number, s.order_qty
+                    FROM import_source.components s
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM main.components c WHERE c.part_number = s.part_number
+                    )
+                    ORDER BY s.rowid
+                """,
+                ),
+                "removed": sample_rows(
+                    conn,
+                    """
+                    SELECT c.part_number, c.order_qty
+                    FROM main.components c
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM import_source.components s
+                        WHERE s.part_number = c.part_number
+                    )
+                    ORDER BY c.id
+                """,
+                ),
+                "changed": sample_rows(
+                    conn,
+                    f"""
+                    SELECT
+                        s.part_number,
+                        c.order_qty AS old_qty,
+                        s.order_qty AS new_qty,
+                        RTRIM({differing_columns}, ',') AS columns
+                    FROM import_source.components s
+                    JOIN main.components c ON c.part_number = s.part_number
+                    WHERE {differs}
+                    ORDER BY s.rowid
+                """,
+                ),
+                # The real import fails on these (part_number is UNIQUE)
+                "duplicate_part_numbers": sample_rows(
+                    conn,
+                    """
+                    SELECT part_number, COUNT(*) AS row_count
+                    FROM import_source.components
+                    GROUP BY part_number HAVING COUNT(*) > 1
+                    ORDER BY MIN(rowid)
+                """,
+                ),
+                # Replacing the database also clears these
+                "cart_items_cleared": conn.execute("SELECT COUNT(*) FROM cart").fetchone()[0],
+                "changelog_entries_cleared": conn.execute(
+                    "SELECT COUNT(*) FROM change_log"
+                ).fetchone()[0],
+            }
+            return result
+        finally:
+            conn.rollback()
+            conn.execute("DETACH DATABASE import_source")
+            db_pool.release(conn)
+    finally:
+        shutil.rmtree(stage_dir, ignore_errors=True)
+
+
+@app.get("/sync_changes")
+@offload("read")
+def sync_changes(since: Optional[str] = None):
+    """Return the component rows changed since a cursor of an earlier call, and a new cursor.
+
+    Rows are split into inserts and updates (keyed by part number) and deletes (part
+    numbers). Without a cursor, or with one from a different database (e.g. before
+    /import_database replaced it), the response has reset set and lists every row as
+    an insert; the receiver then drops the rows it does not list.
+    """
+    position = decode_cursor(since) if since else {}
+    conn = db_pool.acquire()
+    try:
+        # One read transaction, so the new cursor matches the rows returned
+        conn.execute("BEGIN")
+        database_id, last_seq = conn.execute(
+            "SELECT database_id, last_seq FROM sync_state"
+        ).fetchone()
+        reset = position.get("database") != database_id
+        after = 0 if reset else position.get("seq")
+        if not isinstance(after, int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+        rows = conn.execute(
+            f"""
+            SELECT s.created_seq > ? AS created, s.deleted,
+                   {', '.join(f's.{col}' if col == 'part_number' else f'c.{col}' for col in SYNC_COLUMNS)}
+            FROM component_sync s
+            LEFT JOIN components c ON c.part_number = s.part_number
+            WHERE s.seq > ? AND NOT (s.deleted AND s.created_seq > ?)
+            ORDER BY s.seq, c.id
+        """,
+            (after, after, after),
+        ).fetchall()
+    finally:
+        db_pool.release(conn)
+
+    delta = {"inserts": [], "updates": [], "deletes": []}
+    for row in rows:
+        if row["deleted"]:
+            delta["deletes"].append(row["part_number"])
+        else:
+            kind = "inserts" if row["created"] else "updates"
+            delta[kind].append({col: row[col] for col in SYNC_COLUMNS})
+    return {
+        "database_id": database_id,
+        "cursor": encode_cursor({"database": database_id, "seq": last_seq}),
+        "reset": reset,
+        **delta,
+    }
+
+
+class SyncDelta(BaseModel):
+    """A response of /sync_changes, as posted to /apply_sync on the mirror."""
+
+    reset: bool = False
+    inserts: List[dict] = []
+    updates: List[dict] = []
+    deletes: List[str] = []
+    user: Optional[str] = None
+
+
+@app.post("/apply_sync")
+async def apply_sync(delta: SyncDelta):
+    """Apply a /sync_changes delta to this database in one writer job.
+
+    Inserts and updates are upserted by part number with one statement over the
+    rows as a JSON array, deletes are one DELETE; with reset, rows the delta does
+    not list are deleted too.
+    """
+    records = delta.inserts + delta.updates
+    if any(not record.get("part_number") for record in records):
+        raise HTTPException(status_code=400, detail="Every row needs a part_number.")
+    columns = SYNC_COLUMNS + list(UNIT_VALUE_COLUMNS.values())
+    rows = json.dumps(
+        [
+            {**{col: record.get(col) for col in SYNC_COLUMNS}, **unit_value_columns(record)}
+            for record in records
+        ]
+    )
+
+    def apply(conn):
+        if delta.reset:
+            deleted = conn.execute(
+                """
+                DELETE FROM components
+                WHERE part_number IS NULL OR part_number NOT IN (
+                    SELECT json_extract(value, '$.part_number') FROM json_each(?)
+                )
+            """,
+                (rows,),
+            ).rowcount
+        else:
+            deleted = conn.execute(
+                "DELETE FROM components WHERE part_number IN (SELECT value FROM json_each(?))",
+                (json.dumps(delta.deletes),),
+            ).rowcount
+
+        # "WHERE true" keeps the parser from reading ON CONFLICT as a join constraint
+        conn.execute(
+            f"""
+            INSERT INTO components ({', '.join(columns)})
+            SELECT {', '.join(f"json_extract(value, '$.{col}')" for col in columns)}
+            FROM json_each(?) WHERE true
+            ON CONFLICT(part_number) DO UPDATE SET
+                {', '.join(f'{col} = excluded.{col}' for col in columns if col != 'part_number')}
+        """,
+            (rows,),
+        )
+
+        summary = (
+            f"Sync: {len(delta.inserts)} inserted, {len(delta.updates)} updated, "
+            f"{deleted} deleted"
+        )
+        conn.execute(
+            "INSERT INTO change_log (user, action_type, details) VALUES (?, ?, ?)",
+            (delta.user, "sync_apply", summary),
+        )
+        return summary
+
+    summary = await db_writer.execute(apply)
+    return {"message": f"{summary}."}
+
+
+# Add new endpoint for BOM upload
+@app.post("/upload_bom")
+async def upload_bom(
+    file: UploadFile = File(...),
+    user: str = Query(...),
+    stream: bool = Query(False),
+    background: bool = Query(False),
+):
+    if not file.filename.endswith(".csv"):
+        raise HTTPException(status_code=400, detail="Please upload a CSV file.")
+
+    # Spool the uploaded file to disk; it is parsed in chunks
+    path = await spool_upload(file)
+    if background:
+        job = start_import_job(
+            "upload_bom", file.filename, path, load_bom_into_cart, user, stream
+        )
+        return job.snapshot()
+    try:
+        return await run_blocking("import", load_bom_into_cart, path, user, stream)
+    finally:
+        os.remove(path)
+
+
+# Bytes of a BOM file looked at to detect its encoding and delimiter
+BOM_SNIFF_BYTES = 64 * 1024
+
 
-        # Rename columns and select only the ones we want
-        df = df.rename(columns=column_mapping)[list(column_mapping.values())]
+def detect_csv_dialect(path):
+    """Return (encoding, delimiter) of a CSV file, judged from its first bytes.
 
-        # Convert DataFrame to CSV
-        csv_buffer = BytesIO()
-        df.to_csv(csv_buffer, index=False)
-        csv_buffer.seek(0)
+    The encoding comes from the byte-order mark, the NUL pattern of BOM-less UTF-16,
+    or the first of UTF-8, cp1252 and latin1 that decodes the prefix. The delimiter
+    (tab or comma) is sniffed from the complete lines of the prefix.
+    """
+    with open(path, "rb") as f:
+        prefix = f.read(BOM_SNIFF_BYTES)
+    truncated = len(prefix) == BOM_SNIFF_BYTES
+
+    if prefix.startswith(codecs.BOM_UTF8):
+        candidates = ["utf-8-sig"]
+    elif prefix.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        candidates = ["utf-16"]
+    elif prefix[1::2].count(0) > len(prefix) // 4:
+        candidates = ["utf-16-le"]
+    elif prefix[0::2].count(0) > len(prefix) // 4:
+        candidates = ["utf-16-be"]
+    else:
+        candidates = ["utf-8", "cp1252", "latin1"]
 
-        # Return CSV file
-        return StreamingResponse(
-            csv_buffer,
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": f"attachment; filename=component_database_{datetime.datetime.now().strftime('%Y%m%d')}.csv"
-            },
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
+    for encoding in candidates:
+        try:
+            # Incremental, so a character cut off at the end of the prefix is no error
+            text = codecs.getincrementaldecoder(encoding)().decode(
+                prefix, final=not truncated
+            )
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        raise ValueError(f"File is not {' or '.join(candidates)} encoded")
 
+    lines = text.splitlines()
+    if truncated and len(lines) > 1:
+        lines = lines[:-1]
+    if not lines:
+        raise ValueError("File is empty")
 
-@app.post("/format_database")
-async def format_database():
+    header = lines[0]
     try:
-        # Close any existing connections
-        conn = sqlite3.connect("components.db")
-        conn.close()
+        delimiter = csv.Sniffer().sniff("\n".join(lines[:100]), delimiters="\t,").delimiter
+    except csv.Error:
+        delimiter = None
+    if delimiter is None or delimiter not in header:
+        # Same preference as before sniffing: tab separated if the header has tabs
+        delimiter = "\t" if "\t" in header else ","
+    return encoding, delimiter
+
+
+def find_bom_columns(columns):
+    """Return the (supplier_part, quantity, designator, value, footprint) columns of a BOM header."""
+    supplier_part_col = None
+    quantity_col = None
+    designator_col = None
+    value_col = None
+    footprint_col = None
+
+    # Find supplier part column
+    for col in columns:
+        if any(
+            term in col.lower()
+            for term in [
+                "supplier part",
+                "part number",
+                "supplier_part",
+                "partnumber",
+            ]
+        ):
+            supplier_part_col = col
+            break
 
-        # Delete the existing database file
-        if os.path.exists("components.db"):
-            os.remove("components.db")
+    # If not found, try manufacturer part
+    if not supplier_part_col:
+        for col in columns:
+            if any(
+                term in col.lower()
+                for term in ["manufacturer part", "manufacturer_part", "mfr part"]
+            ):
+                supplier_part_col = col
+                break
 
-        # Create a new database
-        create_database()
+    # Find quantity column
+    for col in columns:
+        if any(term in col.lower() for term in ["quantity", "qty", "amount"]):
+            quantity_col = col
+            break
 
-        return {"message": "Database formatted successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # Find designator column
+    for col in columns:
+        if any(term in col.lower() for term in ["designator", "reference", "refdes"]):
+            designator_col = col
+            break
 
+    # Find value column; EasyEDA exports put the value in Comment or Name as well
+    for name in ["value", "comment", "name"]:
+        value_col = next((col for col in columns if col.strip().lower() == name), None)
+        if value_col:
+            break
 
-@app.post("/import_database")
-async def import_database(file: UploadFile = File(...)):
-    if not file.filename.endswith(".csv"):
-        raise HTTPException(status_code=400, detail="Please upload a CSV file.")
+    # Find footprint column
+    for col in columns:
+        if "footprint" in col.lower() or col.strip().lower() == "package":
+            footprint_col = col
+            break
 
-    # Read the uploaded CSV file content
-    content = await file.read()
+    return supplier_part_col, quantity_col, designator_col, value_col, footprint_col
 
-    try:
-        # Use BytesIO to treat the byte content as a file
-        csv_buffer = BytesIO(content)
-        # Assume UTF-8 encoding, which is standard for CSV exports
-        df = pd.read_csv(csv_buffer, encoding="utf-8")
-
-        # Expected columns based on the export function
-        expected_columns = [
-            "LCSC Part Number",
-            "Manufacture Part Number",
-            "Manufacturer",
-            "Package",
-            "Description",
-            "Order Qty.",
-            "Unit Price($)",
-            "Component Type",
-            "Component Branch",
-            "Storage Place",
-            "Capacitance",
-            "Resistance",
-            "Voltage",
-            "Tolerance",
-            "Inductance",
-            "Current/Power",
-        ]
 
-        # Verify columns match
-        if not all(col in df.columns for col in expected_columns):
-            missing = [col for col in expected_columns if col not in df.columns]
-            extra = [col for col in df.columns if col not in expected_columns]
-            error_msg = "CSV columns do not match the expected format."
-            if missing:
-                error_msg += f" Missing: {', '.join(missing)}."
-            if extra:
-                error_msg += f" Unexpected: {', '.join(extra)}."
-            raise HTTPException(status_code=400, detail=error_msg)
-
-        # Format the database (delete existing data)
-        conn = sqlite3.connect("components.db")
-        conn.close()  # Ensure closed before deleting
-        if os.path.exists("components.db"):
-            os.remove("components.db")
-        create_database()
-
-        # Insert data into the new database
-        conn = sqlite3.connect("components.db")
-        cursor = conn.cursor()
+def open_bom_csv(source):
+    """Open a BOM CSV for parsing in one pass.
 
-        # Prepare data for insertion
-        # Rename columns to match the database schema
-        column_mapping = {
-            "LCSC Part Number": "part_number",
-            "Manufacture Part Number": "manufacture_part_number",
-            "Manufacturer": "manufacturer",
-            "Package": "package",
-            "Description": "description",
-            "Order Qty.": "order_qty",
-            "Unit Price($)": "unit_price",
-            "Component Type": "component_type",
-            "Component Branch": "component_branch",
-            "Storage Place": "storage_place",
-            "Capacitance": "capacitance",
-            "Resistance": "resistance",
-            "Voltage": "voltage",
-            "Tolerance": "tolerance",
-            "Inductance": "inductance",
-            "Current/Power": "current_power",
-        }
-        df_renamed = df.rename(columns=column_mapping)
+    Returns (chunks, columns, dialect): an iterator over the IMPORT_CHUNK_ROWS row
+    chunks of the file, its (supplier_part, quantity, designator) columns and the
+    detected {"encoding", "delimiter"}. An unreadable file raises HTTPException(400).
+    """
+    try:
+        encoding, delimiter = detect_csv_dialect(source)
+        # Read every column as str so that all chunks parse the same way
+        chunks = pd.read_csv(
+            source,
+            encoding=encoding,
+            delimiter=delimiter,
+            dtype=str,
+            chunksize=IMPORT_CHUNK_ROWS,
+        )
+        first_chunk = next(chunks, None)
+    except (ValueError, UnicodeDecodeError, pd.errors.ParserError) as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Could not read the CSV file. Please check the file format. Last error: {e}",
+        )
 
-        # Convert relevant columns to appropriate types
-        df_renamed["order_qty"] = (
-            pd.to_numeric(df_renamed["order_qty"], errors="coerce")
-            .fillna(0)
-            .astype(int)
+    if first_chunk is None or first_chunk.empty or len(first_chunk.columns) <= 1:
+        raise HTTPException(
+            status_code=400,
+            detail="Could not read the CSV file. Please check the file format.",
         )
-        df_renamed["unit_price"] = (
-            pd.to_numeric(df_renamed["unit_price"], errors="coerce")
-            .fillna(0.0)
-            .astype(float)
+
+    columns = find_bom_columns(first_chunk.columns)
+    if not columns[0] or not columns[1]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Required columns not found. Available columns: {', '.join(first_chunk.columns)}",
         )
+    dialect = {"encoding": encoding, "delimiter": delimiter}
+    return itertools.chain([first_chunk], chunks), columns, dialect
 
-        # Get list of columns in the correct order for the database table
-        db_columns = list(column_mapping.values())
-        df_renamed = df_renamed[db_columns]
 
-        # Convert DataFrame to list of tuples for executemany
-        data_to_insert = [tuple(x) for x in df_renamed.to_numpy()]
+def load_bom_into_cart(source, user, stream=False, progress=None):
+    """Match the lines of a BOM CSV against the inventory and add the hits to the user's cart.
 
-        # Use executemany for efficient bulk insertion
-        placeholders = ", ".join(["?"] * len(db_columns))
-        sql = (
-            f"INSERT INTO components ({', '.join(db_columns)}) VALUES ({placeholders})"
-        )
+    The encoding and delimiter are detected from a prefix of the file, which is then
+    parsed once, chunk by chunk. The detected dialect is part of the response. With
+    stream the response only reports how many lines were found and not found.
+    """
+    chunks, columns, dialect = open_bom_csv(source)
+
+    # Initialize response data
+    found_components = []
+    not_found_components = []
+    counts = {"found": 0, "not_found": 0}
 
-        cursor.executemany(sql, data_to_insert)
+    def apply(lines, conn):
+        return match_bom_chunk(conn.cursor(), lines, user, suggest=not stream)
 
-        conn.commit()
-        conn.close()
+    try:
+        # Chunks are parsed here; only matching them into the cart is a writer job
+        for chunk in chunks:
+            found, not_found = db_writer.run(apply, bom_lines(chunk, *columns))
+            counts["found"] += len(found)
+            counts["not_found"] += len(not_found)
+            if progress is not None:
+                progress.advance(
+                    rows_parsed=len(chunk),
+                    rows_classified=len(found) + len(not_found),
+                    rows_written=len(found),
+                )
+            if not stream:
+                found_components.extend(found)
+                not_found_components.extend(not_found)
+    except Exception as e:
+        print(f"Error processing BOM: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
+    if stream:
         return {
-            "message": f"Database imported successfully. {len(data_to_insert)} records added."
+            "message": "BOM Upload Results",
+            "dialect": dialect,
+            "found_count": counts["found"],
+            "not_found_count": counts["not_found"],
         }
+    return {
+        "message": "BOM Upload Results",
+        "dialect": dialect,
+        "found_components": found_components,
+        "not_found_components": not_found_components,
+    }
+
+
+# Joins resolving the supplier_part column of BOM lines b to a component: an exact
+# part number wins, otherwise the first component with that manufacturer part number
+BOM_MATCH_JOINS = """
+    LEFT JOIN components p ON p.part_number = b.supplier_part
+    LEFT JOIN components m ON p.id IS NULL AND m.id = (
+        SELECT MIN(id) FROM components WHERE manufacture_part_number = b.supplier_part
+    )
+"""
 
-    except pd.errors.EmptyDataError:
-        raise HTTPException(status_code=400, detail="The uploaded CSV file is empty.")
-    except Exception as e:
-        # Clean up potentially corrupted DB file on error during import
+
+def bom_lines(
+    df, supplier_part_col, quantity_col, designator_col, value_col=None, footprint_col=None
+):
+    """Return the (supplier_part, quantity, designator, value, footprint) of the usable
+    lines of a BOM chunk.
+
+    Lines without a part or without a positive integer quantity are skipped. Value
+    and footprint are None where the BOM has no such column or cell.
+    """
+    missing = [None] * len(df)
+    lines = []
+    for supplier_part, quantity, designator, value, footprint in zip(
+        df[supplier_part_col],
+        df[quantity_col],
+        df[designator_col] if designator_col else ["N/A"] * len(df),
+        df[value_col] if value_col else missing,
+        df[footprint_col] if footprint_col else missing,
+    ):
+        supplier_part = str(supplier_part).strip()
+        # Skip empty rows
+        if supplier_part == "" or supplier_part.lower() == "nan":
+            continue
         try:
-            if "conn" in locals() and conn:
-                conn.close()
-            if os.path.exists("components.db"):
-                os.remove("components.db")
-            create_database()  # Create a fresh empty DB
-        except Exception as cleanup_e:
-            print(f"Error during cleanup after import failure: {cleanup_e}")
-        raise HTTPException(
-            status_code=500, detail=f"Error processing CSV file: {str(e)}"
+            quantity = int(float(quantity))
+        except (ValueError, TypeError, OverflowError):
+            continue
+        if quantity <= 0:
+            continue
+        lines.append(
+            (
+                supplier_part,
+                quantity,
+                str(designator).strip(),
+                value if isinstance(value, str) else None,
+                footprint if isinstance(footprint, str) else None,
+            )
         )
+    return lines
 
 
-# Database connection function
-def get_db_connection():
-    conn = sqlite3.connect("components.db")
-    conn.row_factory = sqlite3.Row
-    return conn
+def match_bom_chunk(cursor, lines, user, suggest=False):
+    """Add the BOM lines (from bom_lines()) that match a component to the user's cart.
 
+    The lines are staged in a temp table and resolved against components with
+    one indexed join (BOM_MATCH_JOINS), then the matches are added to the cart with a
+    single upsert. Returns the (found_components, not_found_components) lists; with
+    suggest every not found line lists its ranked "substitutes" in stock.
+    """
+    cursor.execute("DROP TABLE IF EXISTS temp.bom_stage")
+    cursor.execute(
+        """
+        CREATE TEMP TABLE bom_stage (
+            seq INTEGER PRIMARY KEY,
+            supplier_part TEXT,
+            quantity INTEGER,
+            designator TEXT,
+            value TEXT,
+            footprint TEXT
+        )
+    """
+    )
+    cursor.executemany(
+        """
+        INSERT INTO bom_stage (supplier_part, quantity, designator, value, footprint)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+        lines,
+    )
+    cursor.execute(
+        f"""
+        CREATE TEMP TABLE bom_matches AS
+        SELECT b.seq, b.supplier_part, b.quantity, b.designator, b.value, b.footprint,
+               COALESCE(p.id, m.id) AS component_id,
+               COALESCE(p.part_number, m.part_number) AS part_number
+        FROM bom_stage b
+        {BOM_MATCH_JOINS}
+    """
+    )
+    cursor.execute(
+        """
+        INSERT INTO cart (user, component_id, quantity)
+        SELECT ?, component_id, SUM(quantity)
+        FROM bom_matches
+        WHERE component_id IS NOT NULL
+        GROUP BY component_id
+        ORDER BY MIN(seq)
+        ON CONFLICT (user, component_id) DO UPDATE SET quantity = quantity + excluded.quantity
+    """,
+        (user,),
+    )
 
-# Add new endpoint for BOM upload
-@app.post("/upload_bom")
-async def upload_bom(file: UploadFile = File(...), user: str = Query(...)):
-    if not file.filename.endswith(".csv"):
-        raise HTTPException(status_code=400, detail="Please upload a CSV file.")
+    substitutes = {}
+    if suggest:
+        wanted = []
+        for seq, quantity, designator, value, footprint in cursor.execute(
+            """
+            SELECT seq, quantity, designator, value, footprint
+            FROM bom_matches WHERE component_id IS NULL
+        """
+        ).fetchall():
+            spec = substitute_spec(value, footprint, designator)
+            if spec is not None:
+                wanted.append((seq, quantity, *spec))
+        substitutes = find_substitutes(cursor, wanted)
 
-    # Ensure database and tables exist
-    create_database()
+    found_components = []
+    not_found_components = []
+    for seq, supplier_part, quantity, designator, part_number in cursor.execute(
+        """
+        SELECT seq, supplier_part, quantity, designator, part_number
+        FROM bom_matches ORDER BY seq
+    """
+    ).fetchall():
+        if part_number is not None:
+            found_components.append(
+                {
+                    "part_number": part_number,
+                    "quantity": quantity,
+                    "designator": designator,
+                }
+            )
+        else:
+            not_found = {
+                "supplier_part": supplier_part,
+                "quantity": quantity,
+                "designator": designator,
+            }
+            if suggest:
+                not_found["substitutes"] = substitutes.get(seq, [])
+            not_found_components.append(not_found)
 
-    # Read the uploaded file
-    content = await file.read()
+    cursor.execute("DROP TABLE temp.bom_matches")
+    cursor.execute("DROP TABLE temp.bom_stage")
+    return found_components, not_found_components
 
-    # Try different encodings
-    encodings = ["utf-8-sig", "utf-16", "utf-16le", "cp1252", "iso-8859-1", "latin1"]
-    df = None
-    last_error = None
 
-    for encoding in encodings:
-        try:
-            # Try tab delimiter first
-            df = pd.read_csv(BytesIO(content), delimiter="\t", encoding=encoding)
-            if not df.empty and len(df.columns) > 1:
-                break
+def footprint_package(footprint):
+    """Map an EDA footprint name to the package naming of components ("R0603_x" -> "0603")."""
+    name = footprint.strip().upper().split("_")[0]
+    chip = re.fullmatch(r"[RCL](\d{4})", name)
+    return chip.group(1) if chip else name
 
-            # If that didn't work well, try comma delimiter
-            df = pd.read_csv(BytesIO(content), delimiter=",", encoding=encoding)
-            if not df.empty and len(df.columns) > 1:
-                break
 
-        except Exception as e:
-            last_error = str(e)
-            continue
+def substitute_spec(value, footprint, designator):
+    """Return (kind, value, package, min_voltage, max_tolerance) wanted by a BOM line.
 
-    if df is None or df.empty or len(df.columns) <= 1:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Could not read the CSV file. Please check the file format. Last error: {last_error}",
+    The kind comes from the unit in the value ("100nF", "82kΩ", "10uH"), or for bare
+    numbers ("10k") from the footprint or designator letter. Returns None when the
+    line has no usable value or footprint.
+    """
+    if not value or not footprint:
+        return None
+    kind = None
+    number = None
+    for name, (_, _, param, _) in SUBSTITUTE_KINDS.items():
+        match = PARAMETER_PATTERNS[param].search(value)
+        if match:
+            kind, number = name, parse_unit_value(match.group(1))
+            break
+    if kind is None:
+        letter = (footprint.strip()[:1] + str(designator).strip()[:1]).upper()
+        chip = re.match(r"[RCL]\d{4}", footprint.strip().upper())
+        letter = letter[0] if chip else letter[1:]
+        kind = next(
+            (name for name, (*_, prefix) in SUBSTITUTE_KINDS.items() if prefix == letter),
+            None,
         )
+        number = parse_unit_value(value)
+    if kind is None or not number or number <= 0:
+        return None
 
-    # Initialize response data
-    found_components = []
-    not_found_components = []
-
-    # Get database connection
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    try:
-        # Find the required columns
-        supplier_part_col = None
-        quantity_col = None
-        designator_col = None
+    voltage = PARAMETER_PATTERNS["Voltage"].search(value)
+    tolerance = PARAMETER_PATTERNS["Tolerance"].search(value)
+    return (
+        kind,
+        number,
+        footprint_package(footprint),
+        parse_unit_value(voltage.group(1)) if voltage else None,
+        float(tolerance.group(1).strip("±%")) if tolerance else None,
+    )
 
-        # Find supplier part column
-        for col in df.columns:
-            if any(
-                term in col.lower()
-                for term in [
-                    "supplier part",
-                    "part number",
-                    "supplier_part",
-                    "partnumber",
-                ]
-            ):
-                supplier_part_col = col
-                break
 
-        # If not found, try manufacturer part
-        if not supplier_part_col:
-            for col in df.columns:
-                if any(
-                    term in col.lower()
-                    for term in ["manufacturer part", "manufacturer_part", "mfr part"]
-                ):
-                    supplier_part_col = col
-                    break
+def find_substitutes(cursor, wanted):
+    """Rank in-stock substitutes for BOM lines [(seq, quantity, *substitute_spec)].
 
-        # Find quantity column
-        for col in df.columns:
-            if any(term in col.lower() for term in ["quantity", "qty", "amount"]):
-                quantity_col = col
-                break
+    Candidates share the line's package and value and belong to a branch that lists
+    the value's parameter in component_config.json. Each line is one lookup on the
+    (branch, package, value) substitute index, so its cost does not grow with the
+    inventory. Candidates with a lower voltage rating or a wider tolerance than
+    the line asks for are left out. The rest rank by covering the quantity, known
+    ratings, stock and price. Returns {seq: [candidate dicts]}.
+    """
+    branches = defaultdict(set)
+    for branch, _, branch_data in get_classifier().branches:
+        for kind, (_, _, param, _) in SUBSTITUTE_KINDS.items():
+            if param in branch_data["Parameters"]:
+                branches[kind].add(branch)
+
+    tolerance = "CAST(REPLACE(REPLACE(tolerance, '±', ''), '%', '') AS REAL)"
+    substitutes = {}
+    for seq, quantity, kind, value, package, voltage, max_tolerance in wanted:
+        value_col, text_col, _, _ = SUBSTITUTE_KINDS[kind]
+        kind_branches = sorted(branches[kind])
+        if not kind_branches:
+            continue
+        rows = cursor.execute(
+            f"""
+            SELECT part_number, component_branch, package, {text_col} AS value, voltage,
+                   tolerance, order_qty, unit_price, storage_place
+            FROM components
+            WHERE component_branch IN ({", ".join("?" for _ in kind_branches)})
+              AND UPPER(package) = ?
+              AND {value_col} BETWEEN ? AND ?
+              AND order_qty > 0
+              AND (? IS NULL OR voltage_value IS NULL OR voltage_value >= ?)
+              AND (? IS NULL OR {tolerance} IS NULL OR {tolerance} <= ?)
+            ORDER BY order_qty >= ? DESC, voltage_value IS NULL, {tolerance} IS NULL,
+                     order_qty DESC, unit_price IS NULL, unit_price, part_number
+            LIMIT ?
+        """,
+            (
+                *kind_branches,
+                package,
+                value * (1 - 1e-6),
+                value * (1 + 1e-6),
+                voltage,
+                voltage,
+                max_tolerance,
+                max_tolerance,
+                quantity,
+                SUBSTITUTE_SUGGESTIONS,
+            ),
+        ).fetchall()
+        substitutes[seq] = [dict(row) for row in rows]
+    return substitutes
 
-        # Find designator column
-        for col in df.columns:
-            if any(
-                term in col.lower() for term in ["designator", "reference", "refdes"]
-            ):
-                designator_col = col
-                break
 
-        if not supplier_part_col or not quantity_col:
+@app.post("/plan_build")
+async def plan_build(
+    files: List[UploadFile] = File(...),
+    counts: List[int] = Query(...),
+):
+    """Plan building counts[i] boards of BOM files[i] from the current stock."""
+    if len(counts) != len(files):
+        raise HTTPException(
+            status_code=400, detail="Give one build count per BOM file."
+        )
+    for file, count in zip(files, counts):
+        if not file.filename.lower().endswith(".csv"):
+            raise HTTPException(
+                status_code=400, detail=f"{file.filename}: please upload a CSV file."
+            )
+        if count < 0:
             raise HTTPException(
-                status_code=400,
-                detail=f"Required columns not found. Available columns: {', '.join(df.columns)}",
+                status_code=400, detail=f"{file.filename}: build count must not be negative."
             )
 
-        # Process each component in the BOM
-        for index, row in df.iterrows():
-            try:
-                supplier_part = str(row[supplier_part_col]).strip()
-                designator = (
-                    str(row[designator_col]).strip() if designator_col else "N/A"
-                )
+    spool_dir = tempfile.mkdtemp(prefix="easydrawers-plan-")
+    try:
+        sources = []
+        for file, count in zip(files, counts):
+            path = await spool_upload(file)
+            spooled = os.path.join(spool_dir, f"{len(sources)}-{os.path.basename(path)}")
+            shutil.move(path, spooled)
+            sources.append((file.filename, spooled, count))
+        return await run_blocking("read", plan_builds, sources)
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
 
-                # Skip empty rows
-                if (
-                    pd.isna(supplier_part)
-                    or supplier_part == ""
-                    or supplier_part.lower() == "nan"
-                ):
-                    continue
 
-                try:
-                    quantity = int(float(row[quantity_col]))
-                    if quantity <= 0:
-                        continue
-                except (ValueError, TypeError):
-                    continue
+def plan_builds(sources):
+    """Aggregate the demand of several BOMs and compare it with the stock.
 
-                # Search for the component in the database
-                cursor.execute(
-                    """
-                    SELECT id, part_number, order_qty 
-                    FROM components 
-                    WHERE part_number = ? OR manufacture_part_number = ?
-                """,
-                    (supplier_part, supplier_part),
+    sources lists (name, path, count) per board. All lines are resolved against
+    components in one query, then demand, shortages, the max buildable count of each
+    board (on its own, from the full stock) and costs are computed column-wise.
+    Lines naming the same component through its part and manufacturer part numbers
+    count as one part; unmatched parts have no stock.
+    """
+    lines = []
+    for board, (name, path, _) in enumerate(sources):
+        try:
+            chunks, columns, _ = open_bom_csv(path)
+            for chunk in chunks:
+                lines.extend(
+                    (board, supplier_part, quantity)
+                    for supplier_part, quantity, *_ in bom_lines(chunk, *columns)
                 )
+        except HTTPException as e:
+            raise HTTPException(status_code=e.status_code, detail=f"{name}: {e.detail}")
+    demand = pd.DataFrame(lines, columns=["board", "supplier_part", "quantity"])
 
-                result = cursor.fetchone()
-
-                if result:
-                    component_id = result[0]
-                    part_number = result[1]
-
-                    # Check if component is already in cart
-                    cursor.execute(
-                        """
-                        SELECT quantity FROM cart 
-                        WHERE user = ? AND component_id = ?
-                    """,
-                        (user, component_id),
-                    )
-
-                    cart_item = cursor.fetchone()
-
-                    if cart_item:
-                        # Update existing cart item
-                        new_quantity = cart_item[0] + quantity
-                        cursor.execute(
-                            """
-                            UPDATE cart 
-                            SET quantity = ? 
-                            WHERE user = ? AND component_id = ?
-                        """,
-                            (new_quantity, user, component_id),
-                        )
-                    else:
-                        # Add new cart item
-                        cursor.execute(
-                            """
-                            INSERT INTO cart (user, component_id, quantity) 
-                            VALUES (?, ?, ?)
-                        """,
-                            (user, component_id, quantity),
-                        )
-
-                    found_components.append(
-                        {
-                            "part_number": part_number,
-                            "quantity": quantity,
-                            "designator": designator,
-                        }
-                    )
-                else:
-                    not_found_components.append(
-                        {
-                            "supplier_part": supplier_part,
-                            "quantity": quantity,
-                            "designator": designator,
-                        }
-                    )
-            except Exception as row_error:
-                print(f"Error processing row {index + 1}: {row_error}")
-                continue
+    conn = db_pool.acquire()
+    try:
+        rows = conn.execute(
+            f"""
+            SELECT b.supplier_part, c.part_number, COALESCE(c.order_qty, 0), c.unit_price
+            FROM (SELECT value AS supplier_part FROM json_each(?)) b
+            {BOM_MATCH_JOINS}
+            LEFT JOIN components c ON c.id = COALESCE(p.id, m.id)
+        """,
+            (json.dumps(demand["supplier_part"].unique().tolist()),),
+        ).fetchall()
+    finally:
+        db_pool.release(conn)
+    stock = pd.DataFrame(
+        [tuple(row) for row in rows],
+        columns=["supplier_part", "part_number", "in_stock", "unit_price"],
+    )
+    demand = demand.merge(stock, on="supplier_part", how="left")
+    # An unmatched supplier part never equals a part number, so the keys cannot collide
+    demand["part"] = demand["part_number"].fillna(demand["supplier_part"])
+    demand["unit_price"] = demand["unit_price"].astype(float)
+
+    per_board = demand.groupby(["board", "part"], as_index=False).agg(
+        quantity=("quantity", "sum"),
+        in_stock=("in_stock", "first"),
+        unit_price=("unit_price", "first"),
+    )
+    build_counts = np.array([count for _, _, count in sources])
+    per_board["required"] = per_board["quantity"] * build_counts[per_board["board"]]
+    per_board["buildable"] = per_board["in_stock"] // per_board["quantity"]
+    per_board["cost"] = per_board["quantity"] * per_board["unit_price"]
+
+    parts = per_board.groupby("part").agg(
+        required=("required", "sum"),
+        in_stock=("in_stock", "first"),
+        unit_price=("unit_price", "first"),
+    )
+    parts = parts[parts["required"] > 0]
+    parts["shortage"] = (parts["required"] - parts["in_stock"]).clip(lower=0)
+    parts = parts.join(
+        demand.groupby("part").agg(
+            part_number=("part_number", "first"),
+            supplier_parts=("supplier_part", lambda values: sorted(set(values))),
+        )
+    )
 
-        conn.commit()
+    boards_stats = per_board.groupby("board").agg(
+        lines=("part", "size"),
+        max_buildable=("buildable", "min"),
+        unit_cost=("cost", "sum"),
+        unpriced_parts=("unit_price", lambda prices: int(prices.isna().sum())),
+    )
+    boards = []
+    for board, (name, _, count) in enumerate(sources):
+        stats = boards_stats.loc[board] if board in boards_stats.index else None
+        boards.append(
+            {
+                "file": name,
+                "count": count,
+                "lines": int(stats["lines"]) if stats is not None else 0,
+                "max_buildable": int(stats["max_buildable"]) if stats is not None else None,
+                "unit_cost": round(float(stats["unit_cost"]), 4) if stats is not None else 0.0,
+                "unpriced_parts": int(stats["unpriced_parts"]) if stats is not None else 0,
+            }
+        )
 
-        return {
-            "message": "BOM Upload Results",
-            "found_components": found_components,
-            "not_found_components": not_found_components,
+    short = parts[parts["shortage"] > 0].sort_values(
+        ["shortage", "part"], ascending=[False, True]
+    )
+    shortages = [
+        {
+            "part_number": part_number if isinstance(part_number, str) else None,
+            "supplier_parts": supplier_parts,
+            "required": int(required),
+            "in_stock": int(in_stock),
+            "shortage": int(shortage),
+            "unit_price": None if pd.isna(unit_price) else float(unit_price),
         }
+        for part_number, supplier_parts, required, in_stock, shortage, unit_price in zip(
+            short["part_number"],
+            short["supplier_parts"],
+            short["required"],
+            short["in_stock"],
+            short["shortage"],
+            short["unit_price"],
+        )
+    ]
 
-    except Exception as e:
-        conn.rollback()
-        print(f"Error processing BOM: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
+    return {
+        "can_build": bool(short.empty),
+        "parts": len(parts),
+        "total_cost": round(float((parts["required"] * parts["unit_price"]).sum()), 4),
+        "shortage_cost": round(float((short["shortage"] * short["unit_price"]).sum()), 4),
+        "unpriced_parts": int(parts["unit_price"].isna().sum()),
+        "boards": boards,
+        "shortages": shortages,
+    }
 
 
 @app.post("/assign_branch_to_location")
@@ -1748,14 +4437,12 @@ async def assign_branch_to_location(request_data: AssignBranchRequest):
             json.dump(config, f, indent=4)
 
         # Update DB: set storage_place for ALL components of this branch
-        conn = sqlite3.connect("components.db")
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE components SET storage_place = ? WHERE component_type = ? AND component_branch = ?",
-            (location, component_type, component_branch),
+        await db_writer.execute(
+            lambda conn: conn.execute(
+                "UPDATE components SET storage_place = ? WHERE component_type = ? AND component_branch = ?",
+                (location, component_type, component_branch),
+            )
         )
-        conn.commit()
-        conn.close()
 
         return {"message": f"Successfully assigned '{component_branch}' to location '{location}'"}
 
@@ -1788,14 +4475,12 @@ async def remove_branch_from_location(request_data: AssignBranchRequest):
                 json.dump(config, f, indent=4)
 
             # Update DB
-            conn = sqlite3.connect("components.db")
-            cursor = conn.cursor()
-            cursor.execute(
-                "UPDATE components SET storage_place = '' WHERE component_type = ? AND component_branch = ?",
-                (component_type, component_branch),
+            await db_writer.execute(
+                lambda conn: conn.execute(
+                    "UPDATE components SET storage_place = '' WHERE component_type = ? AND component_branch = ?",
+                    (component_type, component_branch),
+                )
             )
-            conn.commit()
-            conn.close()
 
         return {"message": f"Branch '{component_branch}' removed from location '{location}'."}
     except Exception as e:
@@ -1824,29 +4509,92 @@ async def clear_all_drawers(confirm: bool = Query(False, description="Set to tru
         pass  # no config yet
 
     # 2. Reset DB
-    conn = sqlite3.connect("components.db")
-    cursor = conn.cursor()
-    cursor.execute("UPDATE components SET storage_place = '' WHERE storage_place != ''")
-    conn.commit()
-    conn.close()
+    await db_writer.execute(
+        lambda conn: conn.execute(
+            "UPDATE components SET storage_place = '' WHERE storage_place > ''"
+        )
+    )
 
     return {"message": "All drawer assignments cleared."}
 
 
+# Representative statements for the access paths covered by SECONDARY_INDEXES
+EXPECTED_QUERY_PLANS = {
+    "bom_match": (
+        f"SELECT COALESCE(p.id, m.id) FROM (SELECT ? AS supplier_part) b {BOM_MATCH_JOINS}",
+        ("",),
+    ),
+    "cart_by_user": (
+        "SELECT c.*, ci.quantity FROM components c JOIN cart ci ON c.id = ci.component_id WHERE ci.user = ?",
+        ("",),
+    ),
+    "cart_item": (
+        "SELECT id, quantity FROM cart WHERE user = ? AND component_id = ?",
+        ("", 0),
+    ),
+    "branch_counts": (
+        "SELECT component_type, component_branch, COUNT(DISTINCT part_number) FROM components GROUP BY component_type, component_branch",
+        (),
+    ),
+    "branch_storage": (
+        "SELECT id FROM components WHERE component_type = ? AND component_branch = ?",
+        ("", ""),
+    ),
+    "storage_data": (
+        "SELECT * FROM components WHERE storage_place > ''",
+        (),
+    ),
+    "changelog": (
+        "SELECT * FROM change_log ORDER BY timestamp DESC LIMIT 100",
+        (),
+    ),
+    "substitutes": (
+        "SELECT part_number FROM components WHERE component_branch IN (?, ?) "
+        "AND UPPER(package) = ? AND capacitance_value BETWEEN ? AND ?",
+        ("", "", "", 0, 0),
+    ),
+    "sync_changes": (
+        "SELECT s.part_number, c.id FROM component_sync s "
+        "LEFT JOIN components c ON c.part_number = s.part_number WHERE s.seq > ?",
+        (0,),
+    ),
+}
+
+
+@app.get("/query_plans")
+@offload("read")
+def query_plans():
+    """Report SQLite's EXPLAIN QUERY PLAN output for the indexed access paths."""
+    conn = db_pool.acquire()
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        plans = {}
+        for name, (sql, params) in EXPECTED_QUERY_PLANS.items():
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+            plans[name] = {"sql": sql, "plan": [row["detail"] for row in rows]}
+        return {"schema_version": version, "plans": plans}
+    finally:
+        db_pool.release(conn)
+
+
 @app.get("/branch_counts")
-async def branch_counts():
+@cached_query("branch_counts")
+@offload("read")
+def branch_counts():
     """Return a nested dict {component_type: {component_branch: count}} of component quantities."""
-    conn = sqlite3.connect("components.db")
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT component_type, component_branch, COUNT(DISTINCT part_number) as total
-        FROM components
-        GROUP BY component_type, component_branch
-        """
-    )
-    rows = cursor.fetchall()
-    conn.close()
+    conn = db_pool.acquire()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT component_type, component_branch, COUNT(DISTINCT part_number) as total
+            FROM components
+            GROUP BY component_type, component_branch
+            """
+        )
+        rows = cursor.fetchall()
+    finally:
+        db_pool.release(conn)
     data = {}
     for c_type, branch, total in rows:
         # Normalise NULL / empty strings to the literal key "null" for easier handling in the UI
@@ -1858,17 +4606,21 @@ async def branch_counts():
 
 # --- Unique values endpoint for populating dropdowns ---
 @app.get("/unique_values")
-async def unique_values(field: str):
+@cached_query("unique_values")
+@offload("read")
+def unique_values(field: str):
     allowed = {"resistance", "capacitance", "voltage", "inductance", "package"}
     if field not in allowed:
         raise HTTPException(status_code=400, detail="Invalid field")
-    conn = sqlite3.connect("components.db")
-    cursor = conn.cursor()
-    cursor.execute(
-        f"SELECT DISTINCT {field} FROM components WHERE {field} IS NOT NULL AND {field} != ''"
-    )
-    values = [row[0] for row in cursor.fetchall() if row[0]]
-    conn.close()
+    conn = db_pool.acquire()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT DISTINCT {field} FROM components WHERE {field} IS NOT NULL AND {field} != ''"
+        )
+        values = [row[0] for row in cursor.fetchall() if row[0]]
+    finally:
+        db_pool.release(conn)
     # Sort with unit-aware sort for all except package
     if field != "package":
         values = sorted(
@@ -1882,7 +4634,70 @@ async def unique_values(field: str):
     return values
 
 
-if __name__ == "__main__":
-    import uvicorn
+def run_import_cli(args):
+    """Run one import from the command line against DATABASE_PATH and print the job status."""
+    work_dir = tempfile.mkdtemp(prefix="easydrawers-cli-")
+    try:
+        if args.command == "import-lcsc-batch":
+            sources = [(os.path.basename(path), path) for path in args.files]
+            func, call_args = import_lcsc_batch, (work_dir, sources, args.user)
+            filename = ", ".join(name for name, _ in sources)
+        else:
+            if args.command == "import-lcsc":
+                func, call_args = import_lcsc_csv, (args.file, args.user, args.stream)
+            elif args.command == "upload-bom":
+                func, call_args = load_bom_into_cart, (args.file, args.user, args.stream)
+            else:
+                fmt = database_file_format(args.file) or "csv"
+                # Load in place: the server may have the database open
+                func = functools.partial(import_database_csv, fmt=fmt, in_place=True)
+                call_args = (args.file,)
+            filename = os.path.basename(args.file)
+
+        job = ImportJob(args.command, filename)
+        job.execute(func, *call_args)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(json.dumps(job.snapshot(), indent=2, default=str))
+    return 0 if job.status == "done" else 1
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="EasyDrawers inventory server")
+    commands = parser.add_subparsers(dest="command")
+    serve = commands.add_parser("serve", help="run the web server (default)")
+    serve.add_argument("--host", default="0.0.0.0")
+    serve.add_argument("--port", type=int, default=8000)
+    lcsc = commands.add_parser("import-lcsc", help="add an LCSC order CSV to the inventory")
+    lcsc.add_argument("file")
+    lcsc.add_argument("--user", required=True)
+    lcsc.add_argument("--stream", action="store_true", help="omit the component list")
+    batch = commands.add_parser(
+        "import-lcsc-batch", help="add many LCSC order CSVs or ZIPs of them in parallel"
+    )
+    batch.add_argument("files", nargs="+")
+    batch.add_argument("--user", required=True)
+    database = commands.add_parser(
+        "import-database", help="replace the inventory with an exported CSV"
+    )
+    database.add_argument("file")
+    bom = commands.add_parser("upload-bom", help="add the matching lines of a BOM to a cart")
+    bom.add_argument("file")
+    bom.add_argument("--user", required=True)
+    bom.add_argument("--stream", action="store_true", help="omit the line lists")
+    args = parser.parse_args()
+
+    if args.command in (None, "serve"):
+        import uvicorn
+
+        uvicorn.run(
+            app,
+            host=getattr(args, "host", "0.0.0.0"),
+            port=getattr(args, "port", 8000),
+        )
+    else:
+        sys.exit(run_import_cli(args))
@@ -70,17 +70,9 @@ document.addEventListener('DOMContentLoaded', function () {
             const formData = new FormData();
             formData.append('file', fileToImport);
             try {
-                const response = await fetch('/import_database', {
-                    method: 'POST',
-                    body: formData
-                });
-                if (response.ok) {
-                    alert('Database imported successfully');
-                    window.location.reload();
-                } else {
-                    const error = await response.json();
-                    alert('Failed to import database: ' + error.detail);
-                }
+                await runImportJob('/import_database', formData);
+                alert('Database imported successfully');
+                window.location.reload();
             } catch (error) {
                 alert('Failed to import database: ' + error.message);
             }
@@ -0,0 +1,18 @@
+const IMPORT_POLL_INTERVAL_MS = 1000; // How often a background import job is polled
+
+// Start a background import job for the upload and resolve with its result once it is done
+async function runImportJob(url, formData) {
+    const separator = url.includes('?') ? '&' : '?';
+    const response = await fetch(`${url}${separator}background=true`, { method: 'POST', body: formData });
+    let job = await response.json();
+    if (!response.ok) throw new Error(job.detail || 'Failed to start import');
+
+    while (job.status === 'queued' || job.status === 'running') {
+        await new Promise(resolve => setTimeout(resolve, IMPORT_POLL_INTERVAL_MS));
+        const poll = await fetch(`/import_jobs/${job.job_id}`);
+        job = await poll.json();
+        if (!poll.ok) throw new Error(job.detail || 'Import job not found');
+    }
+    if (job.status !== 'done') throw new Error(job.error || 'Import failed');
+    return job.result;
+}
@@ -3,6 +3,9 @@ const NULL_VALUE = 'null'; // Literal value used to represent missing / uncatego
 let currentUser = localStorage.getItem('currentUser') || 'guest';
 let componentConfig = {};
 let searchResults = []; // Store current search results
+const SEARCH_PAGE_SIZE = 200; // Rows requested per /search_component page
+let searchNextCursor = null; // Cursor of the next result page (null when all are loaded)
+let searchTotal = 0; // Total number of matches reported by the server
 let currentSortColumn = null;
 let sortOrderAsc = true; // Sort order flag
 let branchCountsMain = {};
@@ -138,7 +141,8 @@ document.addEventListener('DOMContentLoaded', function () {
     document.getElementById("uploadCsvForm")?.addEventListener("submit", handleLCSCImport);
     document.getElementById("addComponentForm")?.addEventListener("submit", handleAddComponent);
     document.getElementById("uploadBomButton")?.addEventListener('click', handleBomToCart);
-    document.getElementById("searchButton")?.addEventListener("click", searchComponent);
+    document.getElementById("searchButton")?.addEventListener("click", () => searchComponent());
+    document.getElementById("loadMoreResults")?.addEventListener("click", () => searchComponent(true));
     document.getElementById("searchQuery")?.addEventListener("keydown", (e) => { if (e.key === "Enter") searchComponent() });
 
     // NEW: Display chosen file name for LCSC CSV import
@@ -273,13 +277,13 @@ async function handleLCSCImport(event) {
         formData.append("file", file);
 
         try {
-        const response = await fetch(`/update_components_from_csv?user=${encodeURIComponent(user)}`, { method: 'POST', body: formData });
-        const result = await response.json();
-        if (!response.ok) throw new Error(result.detail || 'Failed to upload components');
+        const result = await runImportJob(`/update_components_from_csv?user=${encodeURIComponent(user)}`, formData);
         
                 alert(result.message);
         if (result.components?.length > 0) {
                     searchResults = result.components;
+                    searchNextCursor = null;
+                    searchTotal = searchResults.length;
             if (typeof populateFilterComponentTypes === 'function') {
                 populateFilterComponentTypes();
                 populateFilterComponentBranches();
@@ -353,10 +357,7 @@ async function handleBomToCart() {
     formData.append('file', file);
     
     try {
-        const response = await fetch(`/upload_bom?user=${user}`, { method: 'POST', body: formData });
-        if (!response.ok) throw new Error(await response.text());
-        
-        const result = await response.json();
+        const result = await runImportJob(`/upload_bom?user=${user}`, formData);
         updateCartState();
 
         showBomResultModal(result);
@@ -419,9 +420,11 @@ function showBomResultModal(result) {
             const li = document.createElement('li');
             li.innerHTML = `
               <div class="item-main"><span>${c.supplier_part || c.part_number} (${c.designator})</span><span>${c.quantity} pcs</span></div>
-              ${c.description ? `<small>${c.description}</small>` : ''}`;
+              ${c.description ? `<small>${c.description}</small>` : ''}
+              ${c.substitutes && c.substitutes.length > 0 ? `<small>Substitutes: ${c.substitutes.map(s => `${s.part_number} ${s.value || ''} (${s.storage_place || 'no drawer'}, ${s.order_qty} pcs)`).join(', ')}</small>` : ''}`;
             ul.appendChild(li);
         });
+        body.appendChild(ul);
 
         // copy to clipboard button
         const copyBtn = document.createElement('button');
@@ -472,18 +475,22 @@ function checkViewMode() {
     }
 }
 
-async function searchComponent() {
+async function searchComponent(loadMore = false) {
     const query = document.getElementById("searchQuery").value;
     const componentType = document.getElementById("filterComponentType").value;
     const componentBranch = document.getElementById("filterComponentBranch").value;
     const inStockOnly = document.getElementById("inStockCheckbox").checked;
 
-    let url = `/search_component?query=${encodeURIComponent(query)}&component_type=${encodeURIComponent(componentType)}&component_branch=${encodeURIComponent(componentBranch)}&in_stock=${inStockOnly}`;
+    let url = `/search_component?query=${encodeURIComponent(query)}&component_type=${encodeURIComponent(componentType)}&component_branch=${encodeURIComponent(componentBranch)}&in_stock=${inStockOnly}&limit=${SEARCH_PAGE_SIZE}&include_total=true`;
+    if (loadMore === true && searchNextCursor) url += `&cursor=${encodeURIComponent(searchNextCursor)}`;
     
     try {
     const response = await fetch(url);
         if (!response.ok) throw new Error('Search failed');
-        searchResults = await response.json();
+        const page = await response.json();
+        searchResults = loadMore === true ? searchResults.concat(page.items) : page.items;
+        searchNextCursor = page.next_cursor;
+        searchTotal = page.total ?? searchResults.length;
         if (typeof populateFilterComponentTypes === 'function') {
             populateFilterComponentTypes();
             populateFilterComponentBranches();
@@ -498,7 +505,11 @@ async function searchComponent() {
 function displaySearchResults(results) {
     // Update count badge
     const countEl = document.getElementById('resultsCount');
-    if (countEl) countEl.textContent = `(${results.length})`;
+    if (countEl) countEl.textContent = searchTotal > searchResults.length
+        ? `(${results.length} of ${searchTotal})`
+        : `(${results.length})`;
+    const loadMoreBtn = document.getElementById('loadMoreResults');
+    if (loadMoreBtn) loadMoreBtn.style.display = searchNextCursor ? '' : 'none';
 
     const tableView = document.getElementById("tableViewContainer");
     const cardView = document.getElementById("cardViewContainer");